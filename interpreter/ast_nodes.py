@@ -63,25 +63,26 @@ class Type:
 
 
 # Statements
-@dataclass
+# Statement and expression nodes are visited constantly, so the hot ones use __slots__.
+@dataclass(slots=True)
 class Assignment:
     lvalue: 'PlaceExpression'
     rvalue: 'Expression'
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileLoop:
     condition: 'Expression'
     body: 'Statement'
 
 
-@dataclass
+@dataclass(slots=True)
 class DeclStmt:
     # No need to support record type declarations.
     declaration: Declaration
 
 
-@dataclass
+@dataclass(slots=True)
 class ExprStmt:
     expression: 'Expression'
 
@@ -90,12 +91,12 @@ Statement = Assignment | WhileLoop | DeclStmt | ExprStmt
 
 
 # Place expressions
-@dataclass
+@dataclass(slots=True)
 class VarRef:
     name: str
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldRef:
     record: 'Expression'
     field_name: str
@@ -105,12 +106,12 @@ PlaceExpression = VarRef | FieldRef
 
 
 # Expressions
-@dataclass
+@dataclass(slots=True)
 class PrimitiveLiteral:
     value: int | float | bool
 
 
-@dataclass
+@dataclass(slots=True)
 class ArrayLiteral:
     value: list['Expression']
 
@@ -130,25 +131,25 @@ class RecordLiteral:
 Literal = PrimitiveLiteral | ArrayLiteral | LambdaLiteral | RecordLiteral
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall:
     function: 'Expression'
     arguments: list['Expression']
 
 
-@dataclass
+@dataclass(slots=True)
 class OperatorCall:
     operator: str
     operands: list['Expression']
 
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     # Final statement is the result of the block, if it is an expression statement.
     statements: list[Statement]
 
 
-@dataclass
+@dataclass(slots=True)
 class IfExpr:
     condition: 'Expression'
     then_expr: 'Expression'
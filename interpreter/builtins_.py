@@ -1,65 +1,65 @@
 from typing import Any, Dict, List, Tuple
 from dataclasses import dataclass
 from ast_nodes import *
-from utils import (_np, NUMPY_ENABLED, RuntimeTypeError, RuntimeValue, shape_of_array, build)
+from utils import (_np, NUMPY_ENABLED, RuntimeTypeError, RuntimeValue, _RV_NONE, shape_of_array, array_type, build_zeros, build_ones)
 
 # ----- Builtins -----
 
 def _builtin_print(args: List[RuntimeValue]) -> RuntimeValue:
     # `print` function
     print(*[a.value for a in args])
-    return RuntimeValue(value=None, static_type=None)
+    return _RV_NONE
 
-def _builtin_zeros(args: List[RuntimeValue]) -> RuntimeValue:
+def _fill_args(name: str, args: List[RuntimeValue]) -> Tuple[Tuple[int, ...], type]:
+    # shared argument handling of `zeros` / `ones`: returns (shape, element type)
     if len(args) not in (1, 2):
-        raise RuntimeTypeError("`zeros` expects at most two arguments: shape, type")
+        raise RuntimeTypeError(f"`{name}` expects at most two arguments: shape, type")
     shape_val = args[0].value
-    if not isinstance(shape_val, (tuple, list)):
-        if isinstance(shape_val, _np.ndarray):
-            shape_val = shape_val.tolist()
-        else:
-            raise RuntimeTypeError("`zeros`: arg0 must be array of dims")
+    # exact tuple / list are the common case, check them before the isinstance fallbacks
+    if type(shape_val) is tuple:
+        shape = shape_val
+    elif type(shape_val) is list:
+        shape = tuple(shape_val)
+    elif NUMPY_ENABLED and isinstance(shape_val, _np.ndarray):
+        shape = tuple(shape_val.tolist())
+    elif isinstance(shape_val, (tuple, list)):
+        shape = tuple(shape_val)
+    else:
+        raise RuntimeTypeError(f"`{name}`: arg0 must be array of dims")
     if len(args) == 2:
         init_type = args[1].value
         if not init_type in (float, int):
-            raise RuntimeTypeError("`zeros`: arg1 must be float or int")
+            raise RuntimeTypeError(f"`{name}`: arg1 must be float or int")
     else:
         init_type = float
+    return shape, init_type
+
+# numpy globals are bound as defaults so the hot path reads them as locals
+def _builtin_zeros(args: List[RuntimeValue], _np=_np, NUMPY_ENABLED=NUMPY_ENABLED) -> RuntimeValue:
+    shape, init_type = _fill_args("zeros", args)
     if NUMPY_ENABLED:
-        arr = _np.zeros(tuple(shape_val), dtype=init_type)
-        return RuntimeValue(arr, static_type=Type(base_type=RecordType("array"), dimension=len(shape_val)), shape=shape_of_array(arr))
+        arr = _np.zeros(shape, dtype=init_type)
     else:
         # nested lists, if numpy is disabled
-        arr = build(tuple(shape_val), init_val=0, init_type=init_type)
-        return RuntimeValue(arr, static_type=Type(base_type=RecordType("array"), dimension=len(shape_val)), shape=shape_of_array(arr))
+        arr = build_zeros(shape, init_type)
+    # the shape is known up front, no need to re-derive it from `arr`
+    return RuntimeValue(arr, static_type=array_type(len(shape)), shape=shape)
 
-def _builtin_ones(args: List[RuntimeValue]) -> RuntimeValue:
-    if len(args) not in (1, 2):
-        raise RuntimeTypeError("`ones` expects at most two arguments: shape, type")
-    shape_val = args[0].value
-    if not isinstance(shape_val, (tuple, list)):
-        if isinstance(shape_val, _np.ndarray):
-            shape_val = shape_val.tolist()
-        else:
-            raise RuntimeTypeError("`ones`: arg0 must be array of dims")
-    if len(args) == 2:
-        init_type = args[1].value
-        if not init_type in (float, int):
-            raise RuntimeTypeError("`ones`: arg1 must be float or int")
-    else:
-        init_type = float
+def _builtin_ones(args: List[RuntimeValue], _np=_np, NUMPY_ENABLED=NUMPY_ENABLED) -> RuntimeValue:
+    shape, init_type = _fill_args("ones", args)
     if NUMPY_ENABLED:
-        arr = _np.ones(tuple(shape_val), dtype=init_type)
-        return RuntimeValue(arr, static_type=Type(base_type=RecordType("array"), dimension=len(shape_val)), shape=shape_of_array(arr))
+        arr = _np.ones(shape, dtype=init_type)
     else:
         # nested lists, if numpy is disabled
-        arr = build(tuple(shape_val), init_val=1, init_type=init_type)
-        return RuntimeValue(arr, static_type=Type(base_type=RecordType("array"), dimension=len(shape_val)), shape=shape_of_array(arr))
+        arr = build_ones(shape, init_type)
+    return RuntimeValue(arr, static_type=array_type(len(shape)), shape=shape)
+
+_SHAPE_TYPE = Type(base_type=PrimitiveType("array"), dimension=1)
 
 def _builtin_shape(args: List[RuntimeValue]) -> RuntimeValue:
     if len(args) != 1:
         raise RuntimeTypeError("shape expects 1 argument")
-    return RuntimeValue(shape_of_array(args[0].value), static_type=Type(base_type=PrimitiveType("array"), dimension=1))
+    return RuntimeValue(shape_of_array(args[0].value), static_type=_SHAPE_TYPE)
 
 BUILTINS = {
     'print': _builtin_print,
@@ -1,10 +1,175 @@
-from typing import Any, Dict, List, Tuple
+from dataclasses import fields, is_dataclass
+from typing import Any, Callable, Dict, List, Tuple
 from ast_nodes import *
-from utils import (_np, NUMPY_ENABLED, RuntimeTypeError, RuntimeValue, shape_of_array)
+from utils import (_np, NUMPY_ENABLED, RuntimeTypeError, RuntimeValue, _RV_NONE, _RV_TRUE, _RV_FALSE, _RV_SMALL_INTS,
+                   shape_of_array, array_type, intern_type)
 from builtins_ import BUILTINS
+from jit_pyc import compile_loop, compile_function
+import operator
+
+
+# operator string -> python callable; numpy arrays dispatch through the same dunders
+_UNOPS = {
+    '-': operator.neg,
+    'not': operator.not_,
+}
+
+# comparisons are element-wise on arrays and plain bools on scalars
+_CMP = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+}
+
+_BINOPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '@': operator.matmul,
+    **_CMP,
+    'and': lambda a, b: a and b,
+    'or': lambda a, b: a or b,
+    'index': operator.getitem,
+    '[]': operator.getitem,
+}
+
+# arithmetic operators as ufuncs; on arrays their result is always a new array
+_ARITH_UFUNCS = {
+    '+': _np.add,
+    '-': _np.subtract,
+    '*': _np.multiply,
+    '/': _np.true_divide,
+} if NUMPY_ENABLED else {}
+
+# below this many elements, checking whether a temporary can be reused costs more than it saves
+_REUSE_MIN_SIZE = 1 << 16
+
+# values natively compiled code can take: anything else stays with the interpreter
+_RAW_TYPES = (int, float, _np.ndarray, _np.generic) if NUMPY_ENABLED else (int, float)
+
+
+# immutable type nodes shared by the type checks below
+_UNIT = PrimitiveType("unit")
+_BOOL = PrimitiveType("bool")
+_INT = PrimitiveType("int")
+_FLOAT = PrimitiveType("float")
+_ARRAY = RecordType("array")
+_UNIT_TYPE = intern_type(Type(_UNIT, dimension=0))
+
+# base type of a plain value by its exact python class; type(True) is bool, never int
+_VALUE_BASE_TYPES = {type(None): _UNIT, bool: _BOOL, int: _INT, float: _FLOAT, list: _ARRAY}
+if NUMPY_ENABLED:
+    _VALUE_BASE_TYPES[_np.ndarray] = _ARRAY
+
+
+def _constant(rv: RuntimeValue) -> Callable[[Any], RuntimeValue]:
+    # code of a compile-time constant; `folded` lets enclosing nodes fold in turn
+    def constant(frame) -> RuntimeValue:
+        return rv
+    value = rv.value
+
+    def constant_value(frame) -> Any:
+        return value
+    constant.folded = rv
+    constant.raw = constant_value
+    return constant
+
+
+def _value_code(code: Callable[[Any], RuntimeValue]) -> Callable[[Any], Any]:
+    # code giving the python value of an operand; operators, variables and constants
+    # provide one (`raw`) that skips boxing the value into a RuntimeValue first
+    raw = getattr(code, 'raw', None)
+    if raw is not None:
+        return raw
+
+    def value(frame) -> Any:
+        return code(frame).value
+    return value
+
+
+def _array_value(items: Any) -> RuntimeValue:
+    # the value of an array literal whose items have been evaluated
+    shape = shape_of_array(items)
+    if isinstance(shape, list):
+        dim = shape[0]
+    else:
+        dim = 0
+    return RuntimeValue(items, static_type=array_type(dim), shape=shape)
+
+
+def _operator_error(e: Exception, a: Any, b: Any, is_index: bool, ndarray) -> Exception:
+    # the error a failed binary operator reports
+    if isinstance(a, ndarray) or isinstance(b, ndarray):
+        if is_index:
+            return RuntimeTypeError(f"Array operator error: Indexing error: {e}")
+        return RuntimeTypeError(f"Array operator error: {e}")
+    if is_index:
+        return RuntimeTypeError(f"Indexing error: {e}")
+    if isinstance(e, TypeError):
+        return RuntimeTypeError(f"Operator error: {e}")
+    return e
+
+
+def _reusing_operator(ufunc, plain: Callable, a_fresh: bool, b_fresh: bool) -> Callable:
+    # `plain`, but writing into an operand that is the temporary of a nested arithmetic
+    # operator, so a chain like a + b * c allocates one array instead of one per operator.
+    # Only done when numpy would give the result that temporary's dtype and shape anyway.
+    ndarray = _np.ndarray
+    generic = _np.generic
+    result_type = _np.result_type
+    broadcast_shapes = _np.broadcast_shapes
+
+    # true division of integers gives floats, which result_type doesn't model
+    inexact_only = ufunc is _np.true_divide
+
+    def fits(out: Any, other: Any) -> bool:
+        if type(out) is not ndarray or out.size < _REUSE_MIN_SIZE:
+            return False
+        if inexact_only and out.dtype.kind not in 'fc':
+            return False
+        if type(other) is ndarray:
+            shape = other.shape
+        elif type(other) is int or type(other) is float or isinstance(other, generic):
+            shape = ()
+        else:
+            return False
+        try:
+            return result_type(out, other) == out.dtype and broadcast_shapes(out.shape, shape) == out.shape
+        except (TypeError, ValueError):
+            return False
+
+    def into_temporary(a: Any, b: Any) -> Any:
+        if a_fresh and fits(a, b):
+            return ufunc(a, b, out=a)
+        if b_fresh and fits(b, a):
+            return ufunc(a, b, out=b)
+        return plain(a, b)
+    return into_temporary
+
+
+def _builtin_calls_only(node: Any, called: set) -> bool:
+    # True if nothing under node can keep a reference to the frame it runs in: no lambdas,
+    # no nested function definitions and no calls except to builtin names (collected into called)
+    if isinstance(node, list):
+        return all(_builtin_calls_only(n, called) for n in node)
+    if isinstance(node, (LambdaLiteral, FunctionDef)):
+        return False
+    if isinstance(node, FunctionCall):
+        if not isinstance(node.function, VarRef) or node.function.name not in BUILTINS:
+            return False
+        called.add(node.function.name)
+    if is_dataclass(node):
+        return all(_builtin_calls_only(getattr(node, f.name), called) for f in fields(node))
+    return True
 
 
 class Frame:
+    __slots__ = ('vars', 'parent')
+
     def __init__(self, parent: Optional['Frame'] = None):
         self.vars: Dict[str, RuntimeValue] = {}
         self.parent = parent
@@ -13,10 +178,13 @@ class Frame:
         self.vars[name] = rv
 
     def lookup(self, name: str) -> RuntimeValue:
-        if name in self.vars:
-            return self.vars[name]
-        if self.parent:
-            return self.parent.lookup(name)
+        # walk the scope chain iteratively, first hit wins
+        f = self
+        while f is not None:
+            rv = f.vars.get(name)
+            if rv is not None:
+                return rv
+            f = f.parent
         raise RuntimeTypeError(f"NameError: '{name}' not found in environment")
 
 
@@ -31,9 +199,46 @@ class Interpreter:
             self.global_frame.define(name, rv)
         # table of user-defined functions: name -> FunctionDef node
         self.functions: Dict[str, FunctionDef] = {}
+        # compiled code per node id, filled lazily on first evaluation
+        self._expr_code: Dict[int, Tuple[Any, Callable[[Frame], RuntimeValue]]] = {}
+        self._stmt_code: Dict[int, Tuple[Any, Callable[[Frame], Optional[RuntimeValue]]]] = {}
+        # body code per function/lambda node id, filled on its first call
+        self._function_code: Dict[int, Tuple[Any, Callable[[List[RuntimeValue], Frame], RuntimeValue]]] = {}
+        # node type -> compiler, one dict hit per node instead of an isinstance ladder
+        self._expr_compilers = {
+            PrimitiveLiteral: self._compile_primitive_literal,
+            ArrayLiteral: self._compile_array_literal,
+            VarRef: self._compile_var_ref,
+            FieldRef: self._compile_field_ref,
+            RecordLiteral: self._compile_record_literal,
+            LambdaLiteral: self._compile_lambda_literal,
+            FunctionCall: self._compile_function_call,
+            OperatorCall: self._compile_operator_call,
+            Block: self._compile_block,
+            IfExpr: self._compile_if_expr,
+        }
+        self._stmt_compilers = {
+            ExprStmt: self._compile_expr_stmt,
+            DeclStmt: self._compile_decl_stmt,
+            Assignment: self._compile_assignment,
+            WhileLoop: self._compile_while_loop,
+        }
+        # builtin names that some binding in the program shadows; calls to any other
+        # builtin name are resolved to the python function at compile time
+        self._rebound_builtins: set = set()
+        for d in program.declarations:
+            self._note_binding(getattr(d, "name", None))
+            if isinstance(d, FunctionDef):
+                for p in d.params:
+                    self._note_binding(p.name)
         # init: read declarations and register them
         self._register_declarations(program.declarations)
 
+    def _note_binding(self, name: str):
+        # every site that binds a name into a frame reports it here before running
+        if name in BUILTINS:
+            self._rebound_builtins.add(name)
+
     def _register_declarations(self, decls: List[Any]):
         for d in decls:
             if isinstance(d, FunctionDef):
@@ -52,7 +257,8 @@ class Interpreter:
                 raise RuntimeTypeError(f"Unsupported top-level declaration: {d}")
 
     def _check_type_match(self, expected: Optional[Type], actual: RuntimeValue):
-        if expected is None:
+        # values built by builtins/literals carry interned types: one `is` settles the common case
+        if expected is None or actual.static_type is expected:
             return
         # if actual.static_type is set — we just check directly
         if actual.static_type is not None:
@@ -60,31 +266,32 @@ class Interpreter:
                 return
         # in case `static_type` is not set in runtime, fall through to value inference
         v = actual.value
-        if v is None:
-            inferred = PrimitiveType("unit")
-        elif isinstance(v, bool):
-            inferred = PrimitiveType("bool")
-        elif isinstance(v, int):
-            inferred = PrimitiveType("int")
-        elif isinstance(v, float):
-            inferred = PrimitiveType("float")
-        elif NUMPY_ENABLED and isinstance(v, _np.ndarray):
-            inferred = RecordType("array")
-        elif isinstance(v, list):
-            inferred = RecordType("array")
-        elif actual.is_function:
-            # build function type from func_meta if present
-            fm = actual.func_meta
-            if fm and 'params_type' in fm and 'return_type' in fm:
-                inferred = FunctionType(param_types=fm['params_type'], return_type=fm['return_type'])
-            elif fm and 'params_type' in fm and 'return_type' not in fm:
-                inferred = FunctionType(param_types=fm['params_type'], return_type=Type(PrimitiveType("unit"), dimension=0))
-            elif fm and 'params_type' not in fm and 'return_type' in fm:
-                inferred = FunctionType(param_types=[], return_type=fm['return_type'])
+        inferred = _VALUE_BASE_TYPES.get(type(v))
+        # subclasses of the plain value classes, and functions
+        if inferred is None:
+            if isinstance(v, bool):
+                inferred = _BOOL
+            elif isinstance(v, int):
+                inferred = _INT
+            elif isinstance(v, float):
+                inferred = _FLOAT
+            elif NUMPY_ENABLED and isinstance(v, _np.ndarray):
+                inferred = _ARRAY
+            elif isinstance(v, list):
+                inferred = _ARRAY
+            elif actual.is_function:
+                # build function type from func_meta if present
+                fm = actual.func_meta
+                if fm and 'params_type' in fm and 'return_type' in fm:
+                    inferred = FunctionType(param_types=fm['params_type'], return_type=fm['return_type'])
+                elif fm and 'params_type' in fm and 'return_type' not in fm:
+                    inferred = FunctionType(param_types=fm['params_type'], return_type=_UNIT_TYPE)
+                elif fm and 'params_type' not in fm and 'return_type' in fm:
+                    inferred = FunctionType(param_types=[], return_type=fm['return_type'])
+                else:
+                    inferred = FunctionType(param_types=[], return_type=_UNIT_TYPE)
             else:
-                inferred = FunctionType(param_types=[], return_type=Type(PrimitiveType("unit"), dimension=0))
-        else:
-            raise RuntimeTypeError(f"Unsupported type: {type(v)}")
+                raise RuntimeTypeError(f"Unsupported type: {type(v)}")
 
         # expected.base_type may be PrimitiveType / RecordType / FunctionType
         if isinstance(expected.base_type, PrimitiveType) or isinstance(expected.base_type, RecordType):
@@ -98,6 +305,9 @@ class Interpreter:
             return
 
     def _type_eq(self, a: Type, b: Type) -> bool:
+        # interned types are equal exactly when they are the same object
+        if a is b:
+            return True
         ba = a.base_type
         bb = b.base_type
         if type(ba) != type(bb):
@@ -113,89 +323,194 @@ class Interpreter:
             return self._type_eq(ba.return_type, bb.return_type)
         return False
 
+    # ------------------------
+    # Compilation: every AST node is lowered once into a closure taking a Frame
+    # ------------------------
+    def compile_expression(self, node: Any) -> Callable[[Frame], RuntimeValue]:
+        entry = self._expr_code.get(id(node))
+        if entry is None:
+            compiler = self._expr_compilers.get(type(node))
+            if compiler is None:
+                return self._compile_unsupported(f"Unsupported expression node: {type(node).__name__}")
+            # keep the node alive next to its code so the id() key can't be recycled
+            entry = (node, compiler(node))
+            self._expr_code[id(node)] = entry
+        return entry[1]
+
+    def compile_statement(self, node: Any) -> Callable[[Frame], Optional[RuntimeValue]]:
+        entry = self._stmt_code.get(id(node))
+        if entry is None:
+            compiler = self._stmt_compilers.get(type(node))
+            if compiler is None:
+                # expression nodes (e.g. a Block as a loop body) are valid statements too
+                if type(node) in self._expr_compilers:
+                    return self.compile_expression(node)
+                return self._compile_unsupported(f"Unsupported statement: {type(node).__name__}")
+            entry = (node, compiler(node))
+            self._stmt_code[id(node)] = entry
+        return entry[1]
+
     def eval_expression(self, node: Any, frame: Frame) -> RuntimeValue:
-        if isinstance(node, PrimitiveLiteral):
-            # node.value (int | float | bool)
-            rv = RuntimeValue(node.value, static_type=None)
-            return rv
-
-        if isinstance(node, ArrayLiteral):
-            items = [self.eval_expression(it, frame).value for it in node.value]
-            if NUMPY_ENABLED:
-                items = _np.array(items)
-            shape = shape_of_array(items)
-            if isinstance(shape, list):
-                dim = shape[0]
-            else:
-                dim = 0
-            rv = RuntimeValue(items, static_type=Type(base_type=RecordType("array"),
-                                                    dimension=dim),
-                                                    shape=shape)
-            return rv
-
-        if isinstance(node, VarRef):
-            return frame.lookup(node.name)
-
-        if isinstance(node, FieldRef):
-            rec_rv = self.eval_expression(node.record, frame)
-            rec_val = rec_rv.value
+        return self.compile_expression(node)(frame)
+
+    def exec_statement(self, node: Any, frame: Frame) -> Optional[RuntimeValue]:
+        return self.compile_statement(node)(frame)
+
+    def _compile_unsupported(self, message: str) -> Callable[[Frame], Any]:
+        # defer the error to execution time, as the tree walker did
+        def unsupported(frame: Frame):
+            raise RuntimeTypeError(message)
+        return unsupported
+
+    def _compile_primitive_literal(self, node: PrimitiveLiteral) -> Callable[[Frame], RuntimeValue]:
+        # node.value (int | float | bool); the value is built once and reused by every evaluation
+        value = node.value
+        if value is True:
+            return _constant(_RV_TRUE)
+        if value is False:
+            return _constant(_RV_FALSE)
+        return _constant(RuntimeValue(value, static_type=None))
+
+    def _fold(self, code: Callable[[Frame], RuntimeValue], child_codes: List[Callable]) -> Callable[[Frame], RuntimeValue]:
+        # a node whose children are all constants gives the same value on every evaluation:
+        # evaluate it once now and reuse the result (values are never mutated in place)
+        if not all(hasattr(c, 'folded') for c in child_codes):
+            return code
+        try:
+            rv = code(None)
+        except Exception:
+            # errors keep surfacing at execution time, as without folding
+            return code
+        return _constant(rv)
+
+    def _compile_array_literal(self, node: ArrayLiteral) -> Callable[[Frame], RuntimeValue]:
+        items = node.value
+        if NUMPY_ENABLED and items and all(type(it) is PrimitiveLiteral and type(it.value) in (int, float, bool)
+                                           for it in items):
+            # numbers only: the whole array is built straight from the literal values, once,
+            # without compiling or evaluating the items as separate expressions
+            return _constant(_array_value(_np.array([it.value for it in items])))
+
+        item_codes = [self.compile_expression(it) for it in items]
+        # module globals bound as closure variables, read without a global lookup per call
+        np_array = _np.array if NUMPY_ENABLED else None
+
+        def array_literal(frame: Frame) -> RuntimeValue:
+            items = [code(frame).value for code in item_codes]
+            if np_array is not None:
+                items = np_array(items)
+            return _array_value(items)
+        return self._fold(array_literal, item_codes)
+
+    def _compile_var_ref(self, node: VarRef) -> Callable[[Frame], RuntimeValue]:
+        name = node.name
+
+        def var_ref(frame: Frame) -> RuntimeValue:
+            # Frame.lookup inlined: the innermost frame is probed without a method call.
+            # The hit depth can't be cached on the node: named function calls chain the
+            # callee frame onto the caller's, and later declarations may shadow the name.
+            rv = frame.vars.get(name)
+            if rv is not None:
+                return rv
+            f = frame.parent
+            while f is not None:
+                rv = f.vars.get(name)
+                if rv is not None:
+                    return rv
+                f = f.parent
+            raise RuntimeTypeError(f"NameError: '{name}' not found in environment")
+
+        def var_value(frame: Frame) -> Any:
+            rv = frame.vars.get(name)
+            if rv is not None:
+                return rv.value
+            f = frame.parent
+            while f is not None:
+                rv = f.vars.get(name)
+                if rv is not None:
+                    return rv.value
+                f = f.parent
+            raise RuntimeTypeError(f"NameError: '{name}' not found in environment")
+        var_ref.raw = var_value
+        return var_ref
+
+    def _compile_field_ref(self, node: FieldRef) -> Callable[[Frame], RuntimeValue]:
+        record_code = self.compile_expression(node.record)
+        field_name = node.field_name
+
+        def field_ref(frame: Frame) -> RuntimeValue:
+            rec_val = record_code(frame).value
             if not isinstance(rec_val, dict):
                 raise RuntimeTypeError("Field access on non-record")
-            if node.field_name not in rec_val:
-                raise RuntimeTypeError(f"Field '{node.field_name}' not found in record")
-            v = rec_val[node.field_name]
-            return RuntimeValue(v, static_type=None)
+            if field_name not in rec_val:
+                raise RuntimeTypeError(f"Field '{field_name}' not found in record")
+            return RuntimeValue(rec_val[field_name], static_type=None)
+        return field_ref
+
+    def _compile_record_literal(self, node: RecordLiteral) -> Callable[[Frame], RuntimeValue]:
+        field_codes = [(fname, self.compile_expression(expr)) for fname, expr in node.field_values.items()]
+        record_type = intern_type(Type(base_type=RecordType(node.type), dimension=0))
 
-        if isinstance(node, RecordLiteral):
+        def record_literal(frame: Frame) -> RuntimeValue:
             # create python dict
             d = {}
-            for fname, expr in node.field_values.items():
-                rv = self.eval_expression(expr, frame)
-                d[fname] = rv.value
-            return RuntimeValue(d, static_type=Type(base_type=RecordType(node.type), dimension=0))
-
-        if isinstance(node, LambdaLiteral):
+            for fname, code in field_codes:
+                d[fname] = code(frame).value
+            return RuntimeValue(d, static_type=record_type)
+        return record_literal
+
+    def _compile_lambda_literal(self, node: LambdaLiteral) -> Callable[[Frame], RuntimeValue]:
+        params = node.params  # list of VarDecl
+        for p in params:
+            self._note_binding(p.name)
+        return_type = None
+        if hasattr(node, 'type') and isinstance(node.type, Type):
+            return_type = node.type
+        meta = {
+            'params': params,
+            'return_type': return_type,
+            'node': node
+        }
+
+        def lambda_literal(frame: Frame) -> RuntimeValue:
             # capturing current frame
-            params = node.params  # list of VarDecl
-            return_type = None
-            if hasattr(node, 'type') and isinstance(node.type, Type):
-                return_type = node.type
-            meta = {
-                'params': params,
-                'return_type': return_type,
-                'node': node
-            }
-            rv = RuntimeValue(value=None, static_type=return_type, is_function=True, func_meta={**meta, 'closure': frame})
-            return rv
-
-        if isinstance(node, FunctionCall):
-            # function is an expression (could be VarRef to function, or LambdaLiteral)
-            fn_rv = self.eval_expression(node.function, frame)
+            return RuntimeValue(value=None, static_type=return_type, is_function=True, func_meta={**meta, 'closure': frame})
+        return lambda_literal
+
+    def _compile_function_call(self, node: FunctionCall) -> Callable[[Frame], RuntimeValue]:
+        # function is an expression (could be VarRef to function, or LambdaLiteral)
+        function_code = self.compile_expression(node.function)
+        arg_codes = tuple(self.compile_expression(a) for a in node.arguments)
+        n_args = len(arg_codes)
+        eval_args = self._compile_arguments(arg_codes)
+        fn_name = node.function.name if isinstance(node.function, VarRef) else None
+        functions = self.functions
+
+        def function_call(frame: Frame) -> RuntimeValue:
+            fn_rv = function_code(frame)
             if not fn_rv.is_function:
                 raise RuntimeTypeError("Attempt to call non-function")
             # check if this is a builtin function
             fm = fn_rv.func_meta or {}
             if fm.get('builtin', False):
-                args = [self.eval_expression(a, frame) for a in node.arguments]
-                return fm['pyfunc'](args)
+                return fm['pyfunc'](eval_args(frame))
 
             # now handle user-defined functions: either FunctionDef by name (node.function VarRef) or LambdaLiteral closure
 
             # FunctionDef case
-            if isinstance(node.function, VarRef) and node.function.name in self.functions:
-                fn_node = self.functions[node.function.name]
-                # prepare new frame with closure (current `frame`)
-                new_frame = Frame(parent=frame)
+            if fn_name is not None and fn_name in functions:
+                fn_node = functions[fn_name]
                 # bind parameters (positional)
-                if len(fn_node.params) != len(node.arguments):
-                    raise RuntimeTypeError(f"Function '{fn_node.name}' expected {len(fn_node.params)} args, got {len(node.arguments)}")
-                for param_decl, arg_expr in zip(fn_node.params, node.arguments):
-                    arg_rv = self.eval_expression(arg_expr, frame)
+                if len(fn_node.params) != n_args:
+                    raise RuntimeTypeError(f"Function '{fn_node.name}' expected {len(fn_node.params)} args, got {n_args}")
+                arg_rvs = []
+                for param_decl, code in zip(fn_node.params, arg_codes):
+                    arg_rv = code(frame)
                     # check type
                     self._check_type_match(param_decl.type, arg_rv)
-                    new_frame.define(param_decl.name, arg_rv)
-                # evaluate body (body is Expression)
-                ret = self.eval_expression(fn_node.body, new_frame)
+                    arg_rvs.append(arg_rv)
+                # evaluate body (body is Expression) in a new frame with closure (current `frame`)
+                ret = self._function_body(fn_node)(arg_rvs, frame)
                 # check return type
                 if fn_node.return_type is not None:
                     self._check_type_match(fn_node.return_type, ret)
@@ -206,164 +521,371 @@ class Interpreter:
                 lambda_node = fm['node']
                 closure: Frame = fm['closure'] or frame
                 params = fm['params']
-                if len(params) != len(node.arguments):
-                    raise RuntimeTypeError(f"Lambda expected {len(params)} args, got {len(node.arguments)}")
-                # create frame with parent=closure to respect lexical scope
-                call_frame = Frame(parent=closure)
-                for param_decl, arg_expr in zip(params, node.arguments):
-                    arg_rv = self.eval_expression(arg_expr, frame)
+                if len(params) != n_args:
+                    raise RuntimeTypeError(f"Lambda expected {len(params)} args, got {n_args}")
+                arg_rvs = []
+                for param_decl, code in zip(params, arg_codes):
+                    arg_rv = code(frame)
                     # check type
                     self._check_type_match(param_decl.type, arg_rv)
-                    call_frame.define(param_decl.name, arg_rv)
-                # evaluate lambda body (body is Expression)
-                ret = self.eval_expression(lambda_node.body, call_frame)
+                    arg_rvs.append(arg_rv)
+                # evaluate lambda body (body is Expression) in a frame with parent=closure to respect lexical scope
+                ret = self._function_body(lambda_node)(arg_rvs, closure)
                 if fm.get('return_type'):
                     self._check_type_match(fm.get('return_type'), ret)
                 return ret
 
             raise RuntimeTypeError("Uncallable function value")
 
-        if isinstance(node, OperatorCall):
-            # operator string and operands (list)
-            ops = [self.eval_expression(o, frame) for o in node.operands]
-            # unary
-            if len(ops) == 1:
-                a = ops[0].value
-                if node.operator == '-':
-                    return RuntimeValue(-a, static_type=None)
-                if node.operator == 'not':
-                    return RuntimeValue(not a, static_type=None)
-            # binary
-            if len(ops) == 2:
-                a = ops[0].value
-                b = ops[1].value
-                op = node.operator
-                # array-aware via numpy if possible
-                if NUMPY_ENABLED and (isinstance(a, _np.ndarray) or isinstance(b, _np.ndarray)):
-                    try:
-                        if op == '+': res = a + b
-                        elif op == '-': res = a - b
-                        elif op == '*': res = a * b
-                        elif op == '/': res = a / b
-                        elif op == '@': res = a @ b
-                        elif op in ('==','!=','<','>','<=','>='):
-                            res = eval(f"a {op} b")
-                        elif op == 'index' or op == '[]':
-                            try:
-                                res = a[b]
-                            except Exception as e:
-                                raise RuntimeTypeError(f"Indexing error: {e}")
-                        else:
-                            raise RuntimeTypeError(f"Unsupported operator {op}")
-                        return RuntimeValue(res, static_type=None, shape=shape_of_array(res))
-                    except Exception as e:
-                        raise RuntimeTypeError(f"Array operator error: {e}")
-                # Python scalars / lists
+        if fn_name in BUILTINS:
+            # direct call into the builtin: no frame lookup, no func_meta inspection.
+            # Only valid while nothing shadows the name, which is one set probe to check.
+            pyfunc = BUILTINS[fn_name]
+            rebound = self._rebound_builtins
+
+            def builtin_call(frame: Frame) -> RuntimeValue:
+                if fn_name in rebound:
+                    return function_call(frame)
+                return pyfunc(eval_args(frame))
+            return builtin_call
+        return function_call
+
+    def _function_body(self, fn_node: FunctionDef | LambdaLiteral) -> Callable[[List[RuntimeValue], Frame], RuntimeValue]:
+        # code running a function's body on its checked arguments, in a frame under `parent`
+        entry = self._function_code.get(id(fn_node))
+        if entry is not None:
+            return entry[1]
+        names = [p.name for p in fn_node.params]
+        body_code = self.compile_expression(fn_node.body)
+
+        def interpreted_body(arg_rvs: List[RuntimeValue], parent: Frame) -> RuntimeValue:
+            call_frame = Frame(parent=parent)
+            for name, arg_rv in zip(names, arg_rvs):
+                call_frame.define(name, arg_rv)
+            return body_code(call_frame)
+
+        # an operator over the parameters alone runs as one native python function, on the
+        # same values with the same python operators the interpreter would apply
+        native = compile_function(names, fn_node.body, lambda n: getattr(self.compile_expression(n), 'folded', None))
+        if native is None:
+            run = interpreted_body
+        else:
+            wrap_value = self._wrap_value
+
+            def run(arg_rvs: List[RuntimeValue], parent: Frame) -> RuntimeValue:
                 try:
-                    if op == '+': res = a + b
-                    elif op == '-': res = a - b
-                    elif op == '*': res = a * b
-                    elif op == '/': res = a / b
-                    elif op == '==': res = a == b
-                    elif op == '!=': res = a != b
-                    elif op == '<': res = a < b
-                    elif op == '>': res = a > b
-                    elif op == '<=': res = a <= b
-                    elif op == '>=': res = a >= b
-                    elif op == 'and': res = a and b
-                    elif op == 'or': res = a or b
-                    elif op == 'index' or op == '[]':
-                        try:
-                            res = a[b]
-                        except Exception as e:
-                            raise RuntimeTypeError(f"Indexing error: {e}")
-                    else:
-                        raise RuntimeTypeError(f"Unsupported operator {op}")
+                    res = native(*[rv.value for rv in arg_rvs])
+                except Exception:
+                    # the body has no side effects: rerun it in the interpreter to report the error as usual
+                    return interpreted_body(arg_rvs, parent)
+                return wrap_value(res)
+        self._function_code[id(fn_node)] = (fn_node, run)
+        return run
+
+    def _compile_arguments(self, arg_codes: Tuple[Callable, ...]) -> Callable[[Frame], List[RuntimeValue]]:
+        # builds the argument list of a builtin call; the usual small arities are unrolled
+        if len(arg_codes) == 0:
+            return lambda frame: []
+        if len(arg_codes) == 1:
+            a0, = arg_codes
+            return lambda frame: [a0(frame)]
+        if len(arg_codes) == 2:
+            a0, a1 = arg_codes
+            return lambda frame: [a0(frame), a1(frame)]
+        return lambda frame: [code(frame) for code in arg_codes]
+
+    def _compile_operator_call(self, node: OperatorCall) -> Callable[[Frame], RuntimeValue]:
+        # operator string is resolved to a python callable once, here
+        operand_codes = [self.compile_expression(o) for o in node.operands]
+        op = node.operator
+
+        # unary
+        # operands are read unboxed, so nested operators never box their intermediate results;
+        # only the outermost operator of an expression wraps its result in a RuntimeValue
+        if len(operand_codes) == 1 and op in _UNOPS:
+            a_val = _value_code(operand_codes[0])
+            if op == 'not':
+                def not_operator(frame: Frame) -> RuntimeValue:
+                    return _RV_FALSE if a_val(frame) else _RV_TRUE
+
+                def not_value(frame: Frame) -> bool:
+                    return not a_val(frame)
+                not_operator.raw = not_value
+                return self._fold(not_operator, operand_codes)
+
+            unop = _UNOPS[op]
+
+            def unary_operator(frame: Frame) -> RuntimeValue:
+                return RuntimeValue(unop(a_val(frame)), static_type=None)
+
+            def unary_value(frame: Frame) -> Any:
+                return unop(a_val(frame))
+            unary_operator.raw = unary_value
+            return self._fold(unary_operator, operand_codes)
+
+        # binary
+        if len(operand_codes) == 2:
+            binop = _BINOPS.get(op)
+            if binop is None:
+                return self._compile_unsupported(f"Unsupported operator {op}")
+            a_val, b_val = map(_value_code, operand_codes)
+            ufunc = _ARITH_UFUNCS.get(op)
+            if ufunc is not None:
+                # operands computed by a (non-constant) arithmetic operator are temporaries
+                # nothing else references, so the result may be written into them
+                a_fresh, b_fresh = (type(o) is OperatorCall and o.operator in _ARITH_UFUNCS and not hasattr(c, 'folded')
+                                    for o, c in zip(node.operands, operand_codes))
+                if a_fresh or b_fresh:
+                    binop = _reusing_operator(ufunc, binop, a_fresh, b_fresh)
+            is_index = op in ('index', '[]')
+            # isinstance(x, ()) is always False, which covers the numpy-less build
+            ndarray = _np.ndarray if NUMPY_ENABLED else ()
+
+            b_folded = getattr(operand_codes[1], 'folded', None)
+            if b_folded is not None and not hasattr(operand_codes[0], 'folded'):
+                # constant right operand (i + 1, i < 3): specialized to read it from the closure
+                # instead of calling its code; the operator itself can't be folded here
+                return self._compile_binary_constant(binop, a_val, b_folded.value, is_index, ndarray)
+
+            def binary_operator(frame: Frame) -> RuntimeValue:
+                a = a_val(frame)
+                b = b_val(frame)
+                try:
+                    res = binop(a, b)
+                except Exception as e:
+                    raise _operator_error(e, a, b, is_index, ndarray)
+                # only nested python lists need a traversal to find their shape
+                if isinstance(res, ndarray):
+                    return RuntimeValue(res, static_type=None, shape=res.shape)
+                if isinstance(res, list):
                     return RuntimeValue(res, static_type=None, shape=shape_of_array(res))
-                except TypeError as e:
-                    raise RuntimeTypeError(f"Operator error: {e}")
-            raise RuntimeTypeError("OperatorCall with wrong arity")
-
-        if isinstance(node, Block):
-            # Evaluate sequentially
+                if res is True:
+                    return _RV_TRUE
+                if res is False:
+                    return _RV_FALSE
+                if type(res) is int and -5 <= res <= 256:
+                    return _RV_SMALL_INTS[res + 5]
+                return RuntimeValue(res, static_type=None)
+
+            def binary_value(frame: Frame) -> Any:
+                a = a_val(frame)
+                b = b_val(frame)
+                try:
+                    return binop(a, b)
+                except Exception as e:
+                    raise _operator_error(e, a, b, is_index, ndarray)
+            binary_operator.raw = binary_value
+            return self._fold(binary_operator, operand_codes)
+
+        return self._compile_unsupported("OperatorCall with wrong arity")
+
+    @staticmethod
+    def _compile_binary_constant(binop: Callable, a_val: Callable, b: Any, is_index: bool, ndarray) -> Callable[[Frame], RuntimeValue]:
+        # _compile_operator_call's binary operator with the right operand fixed to b
+        def binary_operator(frame: Frame) -> RuntimeValue:
+            a = a_val(frame)
+            try:
+                res = binop(a, b)
+            except Exception as e:
+                raise _operator_error(e, a, b, is_index, ndarray)
+            if isinstance(res, ndarray):
+                return RuntimeValue(res, static_type=None, shape=res.shape)
+            if isinstance(res, list):
+                return RuntimeValue(res, static_type=None, shape=shape_of_array(res))
+            if res is True:
+                return _RV_TRUE
+            if res is False:
+                return _RV_FALSE
+            if type(res) is int and -5 <= res <= 256:
+                return _RV_SMALL_INTS[res + 5]
+            return RuntimeValue(res, static_type=None)
+
+        def binary_value(frame: Frame) -> Any:
+            a = a_val(frame)
+            try:
+                return binop(a, b)
+            except Exception as e:
+                raise _operator_error(e, a, b, is_index, ndarray)
+        binary_operator.raw = binary_value
+        return binary_operator
+
+    def _compile_block(self, node: Block) -> Callable[[Frame], RuntimeValue]:
+        # (statement code, is ExprStmt) pairs, executed sequentially
+        steps = [(self.compile_statement(st), isinstance(st, ExprStmt)) for st in node.statements]
+
+        def block(frame: Frame) -> RuntimeValue:
             local_frame = Frame(parent=frame)
             last_val: Optional[RuntimeValue] = None
-            for st in node.statements:
-                v = self.exec_statement(st, local_frame)
-                # exec_statement returns RuntimeValue for ExprStmt or None
-                if isinstance(st, ExprStmt):
+            for code, is_expr in steps:
+                v = code(local_frame)
+                # statement code returns RuntimeValue for ExprStmt or None
+                if is_expr:
                     last_val = v
-            return last_val if last_val is not None else RuntimeValue(None, static_type=None)
-
-        if isinstance(node, IfExpr):
-            cond = self.eval_expression(node.condition, frame)
-            if cond.value:
-                return self.eval_expression(node.then_expr, frame)
+            return last_val if last_val is not None else _RV_NONE
+
+        called: set = set()
+        if not _builtin_calls_only(node.statements, called):
+            return block
+        # nothing in this block can capture its frame, so one frame is reused for every run;
+        # a builtin name that the program rebinds, or re-entering while the frame is in use,
+        # falls back to a fresh frame
+        own_frame = Frame()
+        rebound = self._rebound_builtins
+
+        def reusing_block(frame: Frame) -> RuntimeValue:
+            if own_frame.parent is not None or not rebound.isdisjoint(called):
+                return block(frame)
+            own_frame.parent = frame
+            try:
+                last_val: Optional[RuntimeValue] = None
+                for code, is_expr in steps:
+                    v = code(own_frame)
+                    if is_expr:
+                        last_val = v
+                return last_val if last_val is not None else _RV_NONE
+            finally:
+                own_frame.parent = None
+                own_frame.vars.clear()
+        return reusing_block
+
+    def _compile_if_expr(self, node: IfExpr) -> Callable[[Frame], RuntimeValue]:
+        cond_code = self.compile_expression(node.condition)
+        then_code = self.compile_expression(node.then_expr)
+        else_code = self.compile_expression(node.else_expr)
+
+        def if_expr(frame: Frame) -> RuntimeValue:
+            if cond_code(frame).value:
+                return then_code(frame)
             else:
-                return self.eval_expression(node.else_expr, frame)
-
-        raise RuntimeTypeError(f"Unsupported expression node: {type(node).__name__}")
-
-    def exec_statement(self, node: Any, frame: Frame) -> Optional[RuntimeValue]:
-        if isinstance(node, ExprStmt):
-            return self.eval_expression(node.expression, frame)
-
-        if isinstance(node, DeclStmt):
-            decl = node.declaration
-
-            if isinstance(decl, VarDecl):
-                if decl.initializer is None:
-                    rv = RuntimeValue(None, static_type=decl.type)
-                else:
-                    rv = self.eval_expression(decl.initializer, frame)
-                    self._check_type_match(decl.type, rv)
-                frame.define(decl.name, rv)
-                return None
-
-            elif isinstance(decl, FunctionDef):
+                return else_code(frame)
+        return if_expr
+
+    def _compile_expr_stmt(self, node: ExprStmt) -> Callable[[Frame], Optional[RuntimeValue]]:
+        return self.compile_expression(node.expression)
+
+    def _compile_decl_stmt(self, node: DeclStmt) -> Callable[[Frame], Optional[RuntimeValue]]:
+        decl = node.declaration
+        if isinstance(decl, (VarDecl, FunctionDef)):
+            self._note_binding(decl.name)
+
+        if isinstance(decl, VarDecl):
+            name = decl.name
+            decl_type = intern_type(decl.type)
+            if decl.initializer is None:
+                def var_decl(frame: Frame) -> None:
+                    frame.define(name, RuntimeValue(None, static_type=decl_type))
+                return var_decl
+
+            init_code = self.compile_expression(decl.initializer)
+
+            def var_decl_init(frame: Frame) -> None:
+                rv = init_code(frame)
+                self._check_type_match(decl_type, rv)
+                frame.define(name, rv)
+            return var_decl_init
+
+        elif isinstance(decl, FunctionDef):
+            for p in decl.params:
+                self._note_binding(p.name)
+            fn_type = intern_type(Type(base_type=FunctionType(param_types=[p.type for p in decl.params], return_type=decl.return_type), dimension=0))
+
+            def function_def(frame: Frame) -> None:
                 # register function in this scope as RuntimeValue (closure)
                 meta = {'node': decl, 'closure': frame, 'params_type': [p.type for p in decl.params], 'return_type': decl.return_type}
-                rv = RuntimeValue(None, static_type=Type(base_type=FunctionType(param_types=[p.type for p in decl.params], return_type=decl.return_type), dimension=0), is_function=True, func_meta=meta)
-                frame.define(decl.name, rv)
-                return None
-            else:
-                raise RuntimeTypeError("Unsupported declaration in DeclStmt")
+                frame.define(decl.name, RuntimeValue(None, static_type=fn_type, is_function=True, func_meta=meta))
+            return function_def
+        else:
+            return self._compile_unsupported("Unsupported declaration in DeclStmt")
 
-        if isinstance(node, Assignment):
-            # lvalue is PlaceExpression (VarRef or FieldRef)
-            r = self.eval_expression(node.rvalue, frame)
+    def _compile_assignment(self, node: Assignment) -> Callable[[Frame], Optional[RuntimeValue]]:
+        # lvalue is PlaceExpression (VarRef or FieldRef)
+        rvalue_code = self.compile_expression(node.rvalue)
+        lvalue = node.lvalue
 
-            if isinstance(node.lvalue, VarRef):
-                # check existence: if var exists in some parent, set there; else set in current frame
-                # find the frame that holds the variable
+        if isinstance(lvalue, VarRef):
+            name = lvalue.name
+            self._note_binding(name)
+
+            def assign_var(frame: Frame) -> None:
+                r = rvalue_code(frame)
+                # if var exists in some parent, set there; else set in current frame
                 target = frame
-                while target is not None and node.lvalue.name not in target.vars:
+                while target is not None and name not in target.vars:
                     target = target.parent
                 if target is None:
                     # create in current frame
-                    frame.define(node.lvalue.name, r)
+                    frame.define(name, r)
                 else:
-                    target.define(node.lvalue.name, r)
-                return None
+                    target.define(name, r)
+            return assign_var
+
+        if isinstance(lvalue, FieldRef):
+            record_code = self.compile_expression(lvalue.record)
+            field_name = lvalue.field_name
 
-            if isinstance(node.lvalue, FieldRef):
-                rec_rv = self.eval_expression(node.lvalue.record, frame)
+            def assign_field(frame: Frame) -> None:
+                r = rvalue_code(frame)
+                rec_rv = record_code(frame)
                 if not isinstance(rec_rv.value, dict):
                     raise RuntimeTypeError("Assignment to field on non-record")
-                rec_rv.value[node.lvalue.field_name] = r.value
-                return None
-
-            raise RuntimeTypeError("Unsupported lvalue in Assignment")
-
-        if isinstance(node, WhileLoop):
-            while True:
-                cond_rv = self.eval_expression(node.condition, frame)
-                if not cond_rv.value:
-                    break
-                self.exec_statement(node.body, frame)
-            return None
-
-        raise RuntimeTypeError(f"Unsupported statement: {type(node).__name__}")
+                rec_rv.value[field_name] = r.value
+            return assign_field
+
+        return self._compile_unsupported("Unsupported lvalue in Assignment")
+
+    def _compile_while_loop(self, node: WhileLoop) -> Callable[[Frame], Optional[RuntimeValue]]:
+        cond_code = self.compile_expression(node.condition)
+        body_code = self.compile_statement(node.body)
+
+        def while_loop(frame: Frame) -> None:
+            while cond_code(frame).value:
+                body_code(frame)
+
+        # loops that only assign arithmetic to existing variables run as one native python loop
+        lowered = compile_loop(node, lambda n: getattr(self.compile_expression(n), 'folded', None))
+        if lowered is None:
+            return while_loop
+        loop, names, assigned = lowered
+        assigned_at = [names.index(name) for name in assigned]
+
+        def native_while_loop(frame: Frame) -> None:
+            holders = []
+            args = []
+            for name in names:
+                f = frame
+                while f is not None and name not in f.vars:
+                    f = f.parent
+                # unbound names, functions and records keep the interpreter's own errors and metadata
+                if f is None:
+                    return while_loop(frame)
+                rv = f.vars[name]
+                if rv.is_function or not isinstance(rv.value, _RAW_TYPES):
+                    return while_loop(frame)
+                holders.append(f)
+                args.append(rv.value)
+            finished, values = loop(*args)
+            for name, i, value in zip(assigned, assigned_at, values):
+                if value is not args[i]:
+                    holders[i].define(name, self._wrap_value(value))
+            if not finished:
+                # rerun the failing iteration in the interpreter so it raises as usual
+                while_loop(frame)
+        return native_while_loop
+
+    @staticmethod
+    def _wrap_value(value: Any) -> RuntimeValue:
+        # same boxing as the operator compiler applies to its results
+        if value is True:
+            return _RV_TRUE
+        if value is False:
+            return _RV_FALSE
+        if type(value) is int and -5 <= value <= 256:
+            return _RV_SMALL_INTS[value + 5]
+        if NUMPY_ENABLED and isinstance(value, _np.ndarray):
+            return RuntimeValue(value, static_type=None, shape=value.shape)
+        if isinstance(value, list):
+            return RuntimeValue(value, static_type=None, shape=shape_of_array(value))
+        return RuntimeValue(value, static_type=None)
 
     def run(self):
         # execute top-level declarations stored in program.declarations
@@ -371,7 +893,8 @@ class Interpreter:
             if isinstance(decl, FunctionDef):
                 # register function wrapper in global frame
                 meta = {'node': decl, 'closure': self.global_frame, 'params_type':[p.type for p in decl.params], 'return_type': decl.return_type}
-                rv = RuntimeValue(None, static_type=Type(base_type=FunctionType(param_types=[p.type for p in decl.params], return_type=decl.return_type), dimension=0), is_function=True, func_meta=meta)
+                fn_type = intern_type(Type(base_type=FunctionType(param_types=[p.type for p in decl.params], return_type=decl.return_type), dimension=0))
+                rv = RuntimeValue(None, static_type=fn_type, is_function=True, func_meta=meta)
                 self.global_frame.define(decl.name, rv)
                 self.functions[decl.name] = decl
             elif isinstance(decl, VarDecl):
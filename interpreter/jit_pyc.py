@@ -0,0 +1,136 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ast_nodes import *
+
+
+# operators that are written the same way in python source; 'and'/'or' are left out
+# because python skips the right operand, while the interpreter evaluates both
+_INFIX_OPS = {'+', '-', '*', '/', '@', '==', '!=', '<', '>', '<=', '>='}
+
+
+class NotCompilable(Exception):
+    """Raised while lowering a node that has no plain python equivalent."""
+
+
+class _Lowering:
+    """Turns side-effect free expressions into python source over raw (unwrapped) values."""
+
+    def __init__(self, constant_of: Callable[[Any], Any]):
+        # node -> RuntimeValue if the interpreter folded it to a constant, else None
+        self.constant_of = constant_of
+        # language variable name -> python identifier (v0, v1, ...), so no name can clash with python
+        self.names: Dict[str, str] = {}
+        # python identifier (c0, c1, ...) -> constant value
+        self.consts: Dict[str, Any] = {}
+
+    def var(self, name: str) -> str:
+        ident = self.names.get(name)
+        if ident is None:
+            ident = self.names[name] = f"v{len(self.names)}"
+        return ident
+
+    def const(self, value: Any) -> str:
+        ident = f"c{len(self.consts)}"
+        self.consts[ident] = value
+        return ident
+
+    def expr(self, node: Any) -> str:
+        rv = self.constant_of(node)
+        if rv is not None:
+            return self.const(rv.value)
+        t = type(node)
+        if t is VarRef:
+            return self.var(node.name)
+        if t is OperatorCall:
+            ops = node.operands
+            if len(ops) == 1 and node.operator == '-':
+                return f"(-{self.expr(ops[0])})"
+            if len(ops) == 1 and node.operator == 'not':
+                return f"(not {self.expr(ops[0])})"
+            if len(ops) == 2 and node.operator in _INFIX_OPS:
+                return f"({self.expr(ops[0])} {node.operator} {self.expr(ops[1])})"
+            if len(ops) == 2 and node.operator in ('index', '[]'):
+                return f"{self.expr(ops[0])}[{self.expr(ops[1])}]"
+        if t is IfExpr:
+            return f"({self.expr(node.then_expr)} if {self.expr(node.condition)} else {self.expr(node.else_expr)})"
+        raise NotCompilable(t.__name__)
+
+
+def compile_loop(node: WhileLoop, constant_of: Callable[[Any], Any]) -> Optional[Tuple[Callable, List[str], List[str]]]:
+    """
+    Lowers a while loop whose body only assigns expressions to variables into one python function.
+
+    Returns (loop, names, assigned), or None if the loop doesn't have that shape. `loop` takes the
+    current value of every name in `names` positionally and returns (finished, values of `assigned`).
+    If an iteration raises, it stops and returns (False, values from the start of that iteration),
+    so the caller can rerun that iteration in the interpreter to report the error as usual.
+    """
+    body = node.body
+    stmts = body.statements if type(body) is Block else [body]
+    low = _Lowering(constant_of)
+    assigns = []
+    try:
+        cond = low.expr(node.condition)
+        for st in stmts:
+            if type(st) is not Assignment or type(st.lvalue) is not VarRef:
+                return None
+            assigns.append((low.var(st.lvalue.name), low.expr(st.rvalue)))
+    except NotCompilable:
+        return None
+    if not assigns:
+        return None
+
+    names = list(low.names)
+    params = [low.names[n] for n in names]
+    assigned_idents = list(dict.fromkeys(ident for ident, _ in assigns))
+    state = ", ".join(assigned_idents) + ","
+    src = [
+        f"def loop({', '.join(params)}):",
+        "    while True:",
+        f"        snapshot = ({state})",
+        "        try:",
+        f"            if not {cond}:",
+        "                break",
+    ]
+    src += [f"            {ident} = {expr}" for ident, expr in assigns]
+    src += [
+        "        except Exception:",
+        "            return False, snapshot",
+        f"    return True, ({state})",
+    ]
+    namespace = dict(low.consts)
+    exec(compile("\n".join(src), "<while-loop>", "exec"), namespace)
+    assigned = [names[params.index(ident)] for ident in assigned_idents]
+    return namespace['loop'], names, assigned
+
+
+def compile_function(params: List[str], body: Any, constant_of: Callable[[Any], Any]) -> Optional[Callable]:
+    """
+    Lowers a function whose body is one binary operator over its parameters into a python function.
+
+    Returns None if the body has another shape, uses an operator python would evaluate differently
+    ('and'/'or' short-circuit there), or reads any variable besides the parameters. The
+    result takes the raw parameter values positionally and returns the raw result; since the body
+    has no side effects, a caller that catches an error can rerun the call in the interpreter.
+    """
+    if type(body) is Block:
+        if len(body.statements) != 1 or type(body.statements[0]) is not ExprStmt:
+            return None
+        body = body.statements[0].expression
+    # values of other shapes (a parameter, an if) keep the RuntimeValue the interpreter passes through
+    if type(body) is not OperatorCall or len(body.operands) != 2:
+        return None
+    low = _Lowering(constant_of)
+    idents = [low.var(name) for name in params]
+    if len(low.names) != len(params):
+        return None
+    try:
+        expr = low.expr(body)
+    except NotCompilable:
+        return None
+    if len(low.names) != len(params):
+        # a free variable: resolved through the caller's frames, which python can't see
+        return None
+
+    namespace = dict(low.consts)
+    exec(compile(f"def function({', '.join(idents)}):\n    return {expr}", "<function>", "exec"), namespace)
+    return namespace['function']
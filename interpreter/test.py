@@ -1,12 +1,15 @@
 import unittest
+from functools import lru_cache
 import numpy as np
 
 from ast_nodes import *
-from utils import RuntimeTypeError, RuntimeValue, shape_of_array
+from utils import RuntimeTypeError, RuntimeValue, shape_of_array, build, intern_type
 from builtins_ import _builtin_zeros, _builtin_ones, _builtin_shape
 from interpreter import Interpreter
 
 
+# types are never mutated, so every test can share one instance per (name, dim)
+@lru_cache(maxsize=None)
 def make_type(name: str, dim: int = 0):
     if name in ("int", "float", "bool", "unit"):
         return Type(PrimitiveType(name), dim)
@@ -39,6 +42,19 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(shape_of_array(a), (2, 4))
         self.assertEqual(shape_of_array([[1, 2], [3, 4]]), (2, 2))
 
+    def test_build_filled_array(self):
+        arr = build((2, 3), init_val=1, init_type=int)
+        self.assertEqual(np.asarray(arr).tolist(), [[1, 1, 1], [1, 1, 1]])
+        arr[0][0] = 5
+        self.assertEqual(arr[1][0], 1)
+
+    def test_intern_type_is_shared_and_not_the_argument(self):
+        declared = Type(PrimitiveType("int"), 3)
+        canonical = intern_type(declared)
+        self.assertIsNot(canonical, declared)
+        self.assertEqual(canonical, declared)
+        self.assertIs(intern_type(Type(PrimitiveType("int"), 3)), canonical)
+
 
 class TestInterpreter(unittest.TestCase):
     def setUp(self):
@@ -66,6 +82,34 @@ class TestInterpreter(unittest.TestCase):
         res = self.interp.eval_expression(add, self.gf)
         self.assertTrue(np.allclose(res.value, np.array([4, 6])))
 
+    def test_array_operators_match_numpy(self):
+        a = np.array([1., 2., 3.])
+        b = np.array([4, 5, 6])
+        self.gf.define("a", RuntimeValue(a))
+        self.gf.define("b", RuntimeValue(b))
+        for op, expected in (("+", a + b), ("-", a - b), ("*", a * b), ("/", a / b)):
+            res = self.interp.eval_expression(OperatorCall(op, [VarRef("a"), VarRef("b")]), self.gf)
+            self.assertEqual(res.value.dtype, expected.dtype)
+            self.assertTrue(np.array_equal(res.value, expected))
+            self.assertEqual(res.shape, (3,))
+
+    def test_chained_array_operators_keep_operands(self):
+        a = np.arange(1 << 17, dtype=float)
+        b = np.arange(1 << 17)
+        self.gf.define("a", RuntimeValue(a))
+        self.gf.define("b", RuntimeValue(b))
+        expr = OperatorCall("/", [OperatorCall("*", [VarRef("a"), VarRef("b")]),
+                                  OperatorCall("+", [VarRef("b"), PrimitiveLiteral(1)])])
+        res = self.interp.eval_expression(expr, self.gf)
+        self.assertTrue(np.array_equal(res.value, a * b / (b + 1)))
+        self.assertTrue(np.array_equal(a, np.arange(1 << 17, dtype=float)))
+        self.assertTrue(np.array_equal(b, np.arange(1 << 17)))
+
+    def test_array_comparison(self):
+        arr = ArrayLiteral([PrimitiveLiteral(1), PrimitiveLiteral(5)])
+        res = self.interp.eval_expression(OperatorCall("<", [arr, PrimitiveLiteral(3)]), self.gf)
+        self.assertEqual(res.value.tolist(), [True, False])
+
     def test_var_decl_and_assignment(self):
         decl = VarDecl("x", make_type("int"), mutable=True, initializer=PrimitiveLiteral(5))
         prog = Program(declarations=[decl])
@@ -93,6 +137,52 @@ class TestInterpreter(unittest.TestCase):
         result = interp.eval_expression(call, gf)
         self.assertEqual(result.value, 30.)
 
+    def test_untyped_parameter(self):
+        fn = FunctionDef(
+            name="ident",
+            params=[VarDecl("x", None, mutable=False)],
+            return_type=make_type("int"),
+            body=VarRef("x"),
+        )
+        interp = Interpreter(Program(declarations=[fn]))
+        gf = interp.run()
+        call = FunctionCall(VarRef("ident"), [PrimitiveLiteral(5)])
+        self.assertEqual(interp.eval_expression(call, gf).value, 5)
+
+    def test_function_call_errors_match_interpreter(self):
+        fn = FunctionDef(
+            name="at",
+            params=[
+                VarDecl("a", make_type("int"), mutable=False),
+                VarDecl("i", make_type("int"), mutable=False),
+            ],
+            return_type=make_type("int"),
+            body=OperatorCall("[]", [VarRef("a"), VarRef("i")]),
+        )
+        interp = Interpreter(Program(declarations=[fn]))
+        gf = interp.run()
+        call = FunctionCall(VarRef("at"), [PrimitiveLiteral(1), PrimitiveLiteral(0)])
+        with self.assertRaisesRegex(RuntimeTypeError, "Indexing error"):
+            interp.eval_expression(call, gf)
+
+    def test_function_and_evaluates_both_operands(self):
+        fn = FunctionDef(
+            name="positive_at",
+            params=[
+                VarDecl("a", make_type("array"), mutable=False),
+                VarDecl("i", make_type("int"), mutable=False),
+            ],
+            return_type=make_type("bool"),
+            body=OperatorCall("and", [OperatorCall("<", [VarRef("i"), PrimitiveLiteral(3)]),
+                                      OperatorCall(">", [OperatorCall("[]", [VarRef("a"), VarRef("i")]), PrimitiveLiteral(0)])]),
+        )
+        interp = Interpreter(Program(declarations=[fn]))
+        gf = interp.run()
+        arr = ArrayLiteral([PrimitiveLiteral(1), PrimitiveLiteral(2), PrimitiveLiteral(3)])
+        call = FunctionCall(VarRef("positive_at"), [arr, PrimitiveLiteral(3)])
+        with self.assertRaisesRegex(RuntimeTypeError, "Array operator error: Indexing error: index 3 is out of bounds"):
+            interp.eval_expression(call, gf)
+
     def test_lambda_literal_call(self):
         lmbd = LambdaLiteral(
             params=[VarDecl("x", make_type("int"), mutable=False)],
@@ -129,6 +219,59 @@ class TestInterpreter(unittest.TestCase):
         interp.exec_statement(loop, gf)
         self.assertEqual(gf.lookup("i").value, 3)
 
+    def test_while_loop_block_body(self):
+        decl = VarDecl("i", make_type("int"), mutable=True, initializer=PrimitiveLiteral(0))
+        cond = OperatorCall("<", [VarRef("i"), PrimitiveLiteral(3)])
+        body = Block([Assignment(VarRef("i"), OperatorCall("+", [VarRef("i"), PrimitiveLiteral(1)]))])
+        prog = Program(declarations=[decl])
+        interp = Interpreter(prog)
+        gf = interp.run()
+        interp.exec_statement(WhileLoop(cond, body), gf)
+        self.assertEqual(gf.lookup("i").value, 3)
+
+    def test_block_locals_do_not_leak(self):
+        decl = VarDecl("i", make_type("int"), mutable=True, initializer=PrimitiveLiteral(0))
+        cond = OperatorCall("<", [VarRef("i"), PrimitiveLiteral(3)])
+        body = Block([
+            DeclStmt(VarDecl("t", make_type("int"), mutable=False, initializer=OperatorCall("+", [VarRef("i"), PrimitiveLiteral(1)]))),
+            Assignment(VarRef("i"), VarRef("t")),
+        ])
+        prog = Program(declarations=[decl])
+        interp = Interpreter(prog)
+        gf = interp.run()
+        interp.exec_statement(WhileLoop(cond, body), gf)
+        self.assertEqual(gf.lookup("i").value, 3)
+        with self.assertRaises(RuntimeTypeError):
+            gf.lookup("t")
+
+    def test_while_loop_error_keeps_last_iteration(self):
+        decl_i = VarDecl("i", make_type("int"), mutable=True, initializer=PrimitiveLiteral(0))
+        decl_x = VarDecl("x", make_type("float"), mutable=True, initializer=PrimitiveLiteral(0.0))
+        cond = OperatorCall("<", [VarRef("i"), PrimitiveLiteral(5)])
+        body = Block([
+            Assignment(VarRef("x"), OperatorCall("/", [PrimitiveLiteral(1), OperatorCall("-", [PrimitiveLiteral(2), VarRef("i")])])),
+            Assignment(VarRef("i"), OperatorCall("+", [VarRef("i"), PrimitiveLiteral(1)])),
+        ])
+        prog = Program(declarations=[decl_i, decl_x])
+        interp = Interpreter(prog)
+        gf = interp.run()
+        with self.assertRaises(ZeroDivisionError):
+            interp.exec_statement(WhileLoop(cond, body), gf)
+        self.assertEqual(gf.lookup("i").value, 2)
+        self.assertEqual(gf.lookup("x").value, 1.0)
+
+    def test_while_loop_and_evaluates_both_operands(self):
+        decl = VarDecl("i", make_type("int"), mutable=True, initializer=PrimitiveLiteral(0))
+        cond = OperatorCall("and", [OperatorCall("<", [VarRef("i"), PrimitiveLiteral(3)]),
+                                    OperatorCall(">", [OperatorCall("[]", [VarRef("a"), VarRef("i")]), PrimitiveLiteral(0)])])
+        body = Assignment(VarRef("i"), OperatorCall("+", [VarRef("i"), PrimitiveLiteral(1)]))
+        interp = Interpreter(Program(declarations=[decl]))
+        gf = interp.run()
+        gf.define("a", RuntimeValue(np.array([1, 2, 3])))
+        with self.assertRaisesRegex(RuntimeTypeError, "Array operator error: Indexing error: index 3 is out of bounds"):
+            interp.exec_statement(WhileLoop(cond, body), gf)
+        self.assertEqual(gf.lookup("i").value, 3)
+
     def test_type_mismatch_raises(self):
         decl = VarDecl("x", make_type("int"), mutable=True, initializer=PrimitiveLiteral(3.14))
         prog = Program(declarations=[decl])
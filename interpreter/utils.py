@@ -1,5 +1,7 @@
 from typing import Any, Dict, List, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
+from weakref import WeakValueDictionary
 from ast_nodes import *
 
 
@@ -20,7 +22,7 @@ class RuntimeTypeError(RuntimeErrorWithNode):
     pass
 
 
-@dataclass
+@dataclass(slots=True)
 class RuntimeValue:
     """Wrapper which contains the value itself, static type of the variable (Type/None) and additional metadata"""
     value: Any
@@ -35,7 +37,63 @@ class RuntimeValue:
         return f"RuntimeValue(value={self.value!r}, static_type={t}, shape={self.shape}, is_fn={self.is_function}, func_meta={self.func_meta})"
 
 
+# shared values for the constants every program produces over and over;
+# RuntimeValues are never mutated in place, so handing out one instance is safe
+_RV_NONE = RuntimeValue(None, static_type=None)
+_RV_TRUE = RuntimeValue(True, static_type=None)
+_RV_FALSE = RuntimeValue(False, static_type=None)
+
+# small ints, like CPython's own cache: loop counters and indices are mostly in this range
+_RV_SMALL_INTS = tuple(RuntimeValue(i, static_type=None) for i in range(-5, 257))
+
+
 # helper functions
+# canonical Type instances by structure, so that equal types can be compared with `is`;
+# an entry goes away with the last user of its type
+_TYPE_INTERN: WeakValueDictionary[tuple, Type] = WeakValueDictionary()
+
+
+def _type_key(t: Type) -> Optional[tuple]:
+    b = t.base_type
+    if isinstance(b, PrimitiveType):
+        return ('prim', b.name, t.dimension)
+    if isinstance(b, RecordType):
+        return ('record', b.name, t.dimension)
+    if isinstance(b, FunctionType):
+        # an untyped parameter or return type (None) is a key component of its own
+        parts = []
+        for p in (*b.param_types, b.return_type):
+            if p is None:
+                parts.append(None)
+                continue
+            k = _type_key(p)
+            if k is None:
+                return None
+            parts.append(k)
+        return ('fn', tuple(parts[:-1]), parts[-1], t.dimension)
+    return None
+
+
+def intern_type(t: Optional[Type]) -> Optional[Type]:
+    # returns the canonical instance structurally equal to `t` (types are never mutated)
+    if t is None:
+        return None
+    key = _type_key(t)
+    if key is None:
+        return t
+    canonical = _TYPE_INTERN.get(key)
+    if canonical is None:
+        # a Type of its own, not the caller's (possibly AST-owned) node
+        canonical = _TYPE_INTERN[key] = Type(t.base_type, t.dimension)
+    return canonical
+
+
+@lru_cache(maxsize=None)
+def array_type(dim: int) -> Type:
+    # array types are immutable, so one shared instance per dimension is enough
+    return intern_type(Type(base_type=RecordType("array"), dimension=dim))
+
+
 def shape_of_array(val):
     if NUMPY_ENABLED and isinstance(val, _np.ndarray):
         return tuple(val.shape)
@@ -53,6 +111,30 @@ def shape_of_array(val):
 
 
 def build(dims, init_val=0, init_type=float):
+    if NUMPY_ENABLED:
+        # one contiguous buffer filled in C, like the zeros/ones builtins
+        return _np.full(tuple(dims), init_val, dtype=init_type)
+    # the element is converted once and shared by every row
+    return _build_rows(tuple(dims), init_type(init_val))
+
+
+def build_zeros(dims, init_type=float):
+    return _build_rows(tuple(dims), _ZERO[init_type])
+
+
+def build_ones(dims, init_type=float):
+    return _build_rows(tuple(dims), _ONE[init_type])
+
+
+_ZERO = {int: 0, float: 0.0}
+_ONE = {int: 1, float: 1.0}
+
+
+def _build_rows(dims, leaf):
     if len(dims) == 0:
-        return init_type(init_val)
-    return [build(dims[1:]) for _ in range(dims[0])]
\ No newline at end of file
+        return leaf
+    if len(dims) == 1:
+        # innermost row is preallocated in one go by list repetition
+        return [leaf] * dims[0]
+    # outer levels need distinct row objects, so they can't be repeated
+    return [_build_rows(dims[1:], leaf) for _ in range(dims[0])]
@@ -0,0 +1,93 @@
+import hashlib
+import hmac
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from nodes import Program
+from parser import Parser
+from tokenizer import iter_tokens
+
+# caching is opt-in: set PARSER_CACHE=1 to reuse parsed programs across runs
+CACHE_ENABLED = os.environ.get("PARSER_CACHE") == "1"
+
+_HERE = Path(__file__).resolve().parent
+
+
+def _parser_digest() -> bytes:
+    # a cached AST is only valid for the tokenizer/parser/nodes that produced it
+    h = hashlib.blake2b(digest_size=16)
+    for name in ("tokenizer.py", "parser.py", "nodes.py"):
+        h.update((_HERE / name).read_bytes())
+    return h.digest()
+
+
+_PARSER_DIGEST = _parser_digest()
+
+
+def cache_key(source: str) -> str:
+    h = hashlib.blake2b(_PARSER_DIGEST, digest_size=16)
+    h.update(source.encode())
+    return h.hexdigest()
+
+
+def parse(source: str) -> Program:
+    return Parser(iter_tokens(source)).parse()
+
+
+def _default_cache_dir() -> Path:
+    # per user, never wherever the process happens to run
+    base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "explora-parser"
+
+
+def _secret_key(cache_dir: Path) -> bytes:
+    # entries are signed with a key only this user can read, so a planted
+    # pickle is never loaded
+    path = cache_dir / "key"
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return path.read_bytes()
+    key = os.urandom(32)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def parse_cached(source: str, cache_dir: Optional[Path] = None) -> Program:
+    """
+    Parses `source`, reusing the AST pickled by an earlier run for the same source.
+    Without PARSER_CACHE=1 this is a plain tokenize + parse.
+    """
+    if not CACHE_ENABLED:
+        return parse(source)
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else _default_cache_dir()
+    cache_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+    key = _secret_key(cache_dir)
+    path = cache_dir / f"{cache_key(source)}.pkl"
+    try:
+        data = path.read_bytes()
+        mac, payload = data[:32], data[32:]
+        if hmac.compare_digest(mac, hmac.new(key, payload, hashlib.sha256).digest()):
+            return pickle.loads(payload)
+    except Exception:
+        # missing, unreadable or stale (e.g. pickled from an older node layout): parse again
+        pass
+
+    program = parse(source)
+    payload = pickle.dumps(program, protocol=pickle.HIGHEST_PROTOCOL)
+    # write to a temporary file first, so a concurrent reader never sees a partial pickle
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(hmac.new(key, payload, hashlib.sha256).digest())
+            f.write(payload)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return program
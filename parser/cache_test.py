@@ -0,0 +1,70 @@
+import hashlib
+import hmac
+import pickle
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import cache
+
+SOURCE = "int x = 1 + 2;"
+
+
+class ParseCachedTests(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = Path(tmp.name) / "cache"
+        patcher = mock.patch.object(cache, "CACHE_ENABLED", True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def entry(self):
+        return self.cache_dir / f"{cache.cache_key(SOURCE)}.pkl"
+
+    def sign(self, payload):
+        key = (self.cache_dir / "key").read_bytes()
+        return hmac.new(key, payload, hashlib.sha256).digest() + payload
+
+    """
+    A second parse of the same source is read back from the cache.
+    """
+    def test_hit(self):
+        first = cache.parse_cached(SOURCE, self.cache_dir)
+        self.assertTrue(self.entry().exists())
+        with mock.patch.object(cache, "parse", side_effect=AssertionError("parsed again")):
+            second = cache.parse_cached(SOURCE, self.cache_dir)
+        self.assertEqual(second, first)
+
+    """
+    An entry whose MAC does not match is never unpickled.
+    """
+    def test_rejected_mac(self):
+        expected = cache.parse_cached(SOURCE, self.cache_dir)
+        planted = pickle.dumps("planted")
+        self.entry().write_bytes(b"\0" * 32 + planted)
+        self.assertEqual(cache.parse_cached(SOURCE, self.cache_dir), expected)
+        # the entry was rewritten with a valid signature
+        self.assertNotIn(planted, self.entry().read_bytes())
+
+    """
+    A signed entry that no longer unpickles is parsed again.
+    """
+    def test_stale_pickle(self):
+        expected = cache.parse_cached(SOURCE, self.cache_dir)
+        self.entry().write_bytes(self.sign(b"not a pickle"))
+        self.assertEqual(cache.parse_cached(SOURCE, self.cache_dir), expected)
+
+    """
+    Without PARSER_CACHE nothing is read or written.
+    """
+    def test_disabled(self):
+        with mock.patch.object(cache, "CACHE_ENABLED", False):
+            program = cache.parse_cached(SOURCE, self.cache_dir)
+        self.assertEqual(program, cache.parse(SOURCE))
+        self.assertFalse(self.cache_dir.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
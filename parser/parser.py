@@ -1,8 +1,20 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 from nodes import *
-from tokenizer import Token, TokenType, tokenize
+from tokenizer import Token, TokenStream, TokenType, tokenize, PRECEDENCE
 from pprint import pprint
 
+# Token types read on every token; enum members are singletons, compared with `is`
+_OP = TokenType.OP
+_ID = TokenType.ID
+_KW = TokenType.KW
+_NUMBER = TokenType.NUMBER
+
+# Keyword sets tested per statement/type/literal, built once
+_PRIMITIVE_TYPE_NAMES = frozenset({"int", "float", "bool", "char", "unit"})
+_DECL_STARTERS = frozenset({"int", "float", "bool", "char"})
+_BOOL_LITERALS = frozenset({"true", "false"})
+
+
 class ParserError(Exception):
     """Custom exception for parser errors."""
     pass
@@ -11,9 +23,11 @@ class ParserError(Exception):
 # Parser
 # ------------------------
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self.tokens = tokens
-        self.pos = 0
+    def __init__(self, tokens: Iterable[Token]):
+        # a list is indexed directly; any other iterable (e.g. tokenizer.iter_tokens)
+        # is consumed lazily, one token at a time
+        self.tokens: List[Token] | TokenStream = tokens if isinstance(tokens, list) else TokenStream(tokens)
+        self.pos: int = 0
 
     # ------------------------
     # Token utilities
@@ -26,54 +40,62 @@ class Parser:
         self.pos += 1
         return t
 
-    def expect(self, typ: TokenType, value: str = None) -> Token:
-        t = self.peek()
-        if t.type != typ:
+    # expect/accept run once or more per token: they read the cursor directly
+    # instead of going through peek()/next()
+    def expect(self, typ: TokenType, value: Optional[str] = None) -> Token:
+        t = self.tokens[self.pos]
+        if t.type is not typ:
             raise ParserError(f"Expected {typ}, got {t.type} at pos {t.pos}")
         if value is not None and t.value != value:
             raise ParserError(f"Expected {value}, got {t.value} at pos {t.pos}")
-        return self.next()
+        self.pos += 1
+        return t
 
-    def accept(self, typ: TokenType, value: str = None) -> Optional[Token]:
-        t = self.peek()
-        if t.type == typ and (value is None or t.value == value):
-            return self.next()
+    def accept(self, typ: TokenType, value: Optional[str] = None) -> Optional[Token]:
+        t = self.tokens[self.pos]
+        if t.type is typ and (value is None or t.value == value):
+            self.pos += 1
+            return t
         return None
 
     # ------------------------
     # Program / Declarations
     # ------------------------
     def parse(self) -> Program:
-        decls = []
-        while self.peek().type != TokenType.EOF:
-            decls.append(self.parse_declaration())
+        decls: List[Declaration] = []
+        tokens = self.tokens
+        append = decls.append
+        while tokens[self.pos].type is not TokenType.EOF:
+            append(self.parse_declaration())
         return Program(declarations=decls)
 
-    def parse_array_literal(self):
+    def parse_array_literal(self) -> ArrayLiteral:
         """Parse {1, 2, 3} style array literals."""
         self.expect(TokenType.OP, "{")
-        values = []
+        values: List[Expression] = []
 
         if not self.accept(TokenType.OP, "}"):
+            append = values.append
             while True:
-                values.append(self.parse_expression())
+                append(self.parse_expression())
                 if self.accept(TokenType.OP, "}"):
                     break
                 self.expect(TokenType.OP, ",")
 
         return ArrayLiteral(value=values)
 
-    def parse_declaration(self):
+    def parse_declaration(self) -> FunctionDef | VarDecl:
         # Parse base type
         ttype = self.parse_type()
         name_token = self.expect(TokenType.ID)
         name = name_token.value
 
         # --- NEW: parse possible array dimensions like arr[5][10]
-        array_dims = []
+        array_dims: List[Optional[int]] = []
         while self.accept(TokenType.OP, "["):
-            if self.peek().type == TokenType.NUMBER:
-                size_token = self.next()
+            size_token = self.tokens[self.pos]
+            if size_token.type is _NUMBER:
+                self.pos += 1
                 array_dims.append(int(size_token.value))
             else:
                 array_dims.append(None)
@@ -85,7 +107,7 @@ class Parser:
 
         # --- function declaration ---
         if self.accept(TokenType.OP, "("):
-            params = []
+            params: List[VarDecl] = []
             if not self.accept(TokenType.OP, ")"):
                 while True:
                     param_type = self.parse_type()
@@ -102,28 +124,29 @@ class Parser:
             init = None
             if self.accept(TokenType.OP, "="):
                 # --- NEW: handle array initializer ---
-                if self.peek().type == TokenType.OP and self.peek().value == "{":
+                t = self.tokens[self.pos]
+                if t.type is _OP and t.value == "{":
                     init = self.parse_array_literal()
                 else:
                     init = self.parse_expression()
             self.expect(TokenType.OP, ";")
             return VarDecl(name=name, type=ttype, mutable=True, initializer=init)
 
-    def parse_type(self):
-        t = self.peek()
-        if t.type == TokenType.KW and t.value in {"int", "float", "bool", "char", "unit"}:
-            self.next()
+    def parse_type(self) -> Type:
+        t = self.tokens[self.pos]
+        if t.type is _KW and t.value in _PRIMITIVE_TYPE_NAMES:
+            self.pos += 1
             base = PrimitiveType(t.value)
-        elif t.type == TokenType.ID:
-            name = self.next().value
-            base = RecordType(name)
+        elif t.type is _ID:
+            self.pos += 1
+            base = RecordType(t.value)
         else:
             raise ParserError(f"Unknown type {t.value} at pos {t.pos}")
 
         dim = 0
         while self.accept(TokenType.OP, "["):
-            if self.peek().type == TokenType.NUMBER:
-                self.next()  # skip number (you could store this size too)
+            if self.tokens[self.pos].type is _NUMBER:
+                self.pos += 1  # skip number (you could store this size too)
             self.expect(TokenType.OP, "]")
             dim += 1
 
@@ -134,40 +157,49 @@ class Parser:
     # ------------------------
     def parse_block(self) -> Block:
         self.expect(TokenType.OP, "{")
-        stmts = []
-        while not self.accept(TokenType.OP, "}"):
-            if self.peek().type == TokenType.EOF:
+        stmts: List[Statement | Declaration | Block | IfExpr] = []
+        # bound methods hoisted out of the per-statement loop
+        append = stmts.append
+        parse_statement = self.parse_statement
+        tokens = self.tokens
+        while True:
+            t = tokens[self.pos]
+            if t.type is _OP and t.value == "}":
+                self.pos += 1
+                break
+            if t.type is TokenType.EOF:
                 raise ParserError("Unterminated block")
-            stmts.append(self.parse_statement())
+            append(parse_statement())
         return Block(statements=stmts)
 
-    def parse_statement(self):
-        t = self.peek()
+    def parse_statement(self) -> Statement | Declaration | Block | IfExpr:
+        t = self.tokens[self.pos]
 
-        if t.type == TokenType.KW:
+        if t.type is _KW:
             if t.value == "if":
                 return self.parse_if()
             elif t.value == "while":
                 return self.parse_while()
             elif t.value == "return":  # <- new handling
-                self.next()
+                self.pos += 1
                 expr = None
-                if self.peek().type != TokenType.OP or self.peek().value != ";":
+                nxt = self.tokens[self.pos]
+                if nxt.type is not _OP or nxt.value != ";":
                     expr = self.parse_expression()
                 self.expect(TokenType.OP, ";")
                 # treat return like an expression statement
                 return ExprStmt(expr)
-            elif t.value in {"int", "float", "bool", "char"}:
+            elif t.value in _DECL_STARTERS:
                 return self.parse_declaration()
 
-        if t.type == TokenType.OP and t.value == "{":
+        if t.type is _OP and t.value == "{":
             return self.parse_block()
 
         expr = self.parse_expression()
         self.expect(TokenType.OP, ";")
         return ExprStmt(expr)
 
-    def parse_if(self):
+    def parse_if(self) -> IfExpr:
         self.expect(TokenType.KW, "if")
         self.expect(TokenType.OP, "(")
         cond = self.parse_expression()
@@ -178,7 +210,7 @@ class Parser:
             else_branch = self.parse_statement()
         return IfExpr(condition=cond, then_expr=then_branch, else_expr=else_branch)
 
-    def parse_while(self):
+    def parse_while(self) -> WhileLoop:
         self.expect(TokenType.KW, "while")
         self.expect(TokenType.OP, "(")
         cond = self.parse_expression()
@@ -189,61 +221,54 @@ class Parser:
     # ------------------------
     # Expressions (recursive precedence)
     # ------------------------
-    PRECEDENCE = {
-        "=": 1,
-        "||": 2,
-        "&&": 3,
-        "==": 4, "!=": 4,
-        "<": 5, "<=": 5, ">": 5, ">=": 5,
-        "+": 6, "-": 6,
-        "*": 7, "/": 7, "%": 7,
-    }
-    RIGHT_ASSOC = {"="}
+    # precedence is stored on each token by the tokenizer (Token.prec); the
+    # table is the fallback for operator tokens built elsewhere
+    PRECEDENCE = PRECEDENCE
+    RIGHT_ASSOC = frozenset({"="})
 
-    def parse_expression(self, min_prec=0):
+    def parse_expression(self, min_prec: int = 0) -> Expression | Assignment:
         node = self.parse_primary()
+        tokens = self.tokens
 
         while True:
-            tok = self.peek()
-            if tok.type == TokenType.OP and tok.value in self.PRECEDENCE:
-                prec = self.PRECEDENCE[tok.value]
-                op = tok.value
-                if prec < min_prec:
-                    break
-                self.next()
-                rhs = self.parse_expression(prec + (0 if op in self.RIGHT_ASSOC else 1))
-                if op == "=":
-                    node = Assignment(lvalue=node, rvalue=rhs)
-                else:
-                    node = OperatorCall(operator=op, operands=[node, rhs])
-            else:
+            tok = tokens[self.pos]
+            prec = tok.prec
+            if prec < 0 and tok.type is TokenType.OP:
+                # an operator token not built by the tokenizer carries no prec
+                prec = self.PRECEDENCE.get(tok.value, -1)
+            # non-operators have prec -1, below any min_prec
+            if prec < min_prec:
                 break
+            op = tok.value
+            self.pos += 1
+            rhs = self.parse_expression(prec + (0 if op in self.RIGHT_ASSOC else 1))
+            if op == "=":
+                node = Assignment(lvalue=node, rvalue=rhs)
+            else:
+                node = OperatorCall(operator=op, operands=[node, rhs])
         return node
 
-    def parse_primary(self):
-        tok = self.peek()
-        if tok.type == TokenType.NUMBER:
-            self.next()
+    def parse_primary(self) -> Expression:
+        tok = self.tokens[self.pos]
+        typ = tok.type
+        if typ is _NUMBER:
+            self.pos += 1
             val = float(tok.value) if ('.' in tok.value or 'e' in tok.value or 'E' in tok.value) else int(tok.value)
             return PrimitiveLiteral(val)
-        elif tok.type == TokenType.STRING:
-            self.next()
-            return PrimitiveLiteral(tok.value[1:-1])
-        elif tok.type == TokenType.CHAR:
-            self.next()
-            return PrimitiveLiteral(tok.value[1:-1])
-        elif tok.type == TokenType.KW and tok.value in {"true", "false"}:
-            self.next()
-            return PrimitiveLiteral(tok.value == "true")
-        elif tok.type == TokenType.ID:
-            self.next()
+        elif typ is _ID:
+            self.pos += 1
             node: Expression = VarRef(tok.value)
             while True:
+                # postfix calls and indexing; most identifiers have neither
+                nxt = self.tokens[self.pos]
+                if nxt.type is not _OP or (nxt.value != "(" and nxt.value != "["):
+                    break
                 if self.accept(TokenType.OP, "("):
-                    args = []
+                    args: List[Expression | Assignment] = []
                     if not self.accept(TokenType.OP, ")"):
+                        append = args.append
                         while True:
-                            args.append(self.parse_expression())
+                            append(self.parse_expression())
                             if self.accept(TokenType.OP, ")"):
                                 break
                             self.expect(TokenType.OP, ",")
@@ -256,8 +281,17 @@ class Parser:
                     continue
                 break
             return node
-        elif tok.type == TokenType.OP and tok.value == "(":
-            self.next()
+        elif typ is TokenType.STRING:
+            self.pos += 1
+            return PrimitiveLiteral(tok.value[1:-1])
+        elif typ is TokenType.CHAR:
+            self.pos += 1
+            return PrimitiveLiteral(tok.value[1:-1])
+        elif typ is _KW and tok.value in _BOOL_LITERALS:
+            self.pos += 1
+            return PrimitiveLiteral(tok.value == "true")
+        elif typ is _OP and tok.value == "(":
+            self.pos += 1
             expr = self.parse_expression()
             self.expect(TokenType.OP, ")")
             return expr
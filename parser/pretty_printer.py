@@ -1,108 +1,186 @@
+from typing import List
 from nodes import *
 from tokenizer import tokenize
 from parser import Parser
 
 
 class PrettyPrinter:
-    def __init__(self):
-        self.indent_level = 0
-        self.indent_str = "    "  # 4 spaces
+    def __init__(self) -> None:
+        self.indent_level: int = 0
+        self.indent_str: str = "    "  # 4 spaces
+        self._indents: List[str] = []
 
-    def indent(self):
+    def indent(self) -> None:
         self.indent_level += 1
 
-    def dedent(self):
+    def dedent(self) -> None:
         self.indent_level -= 1
         if self.indent_level < 0:
             self.indent_level = 0
 
     def write_indent(self) -> str:
-        return self.indent_str * self.indent_level
+        # indentation strings are built once per depth
+        while len(self._indents) <= self.indent_level:
+            self._indents.append(self.indent_str * len(self._indents))
+        return self._indents[self.indent_level]
 
     # ------------------------
     # Entry point
     # ------------------------
     def pprint(self, node) -> str:
-        if isinstance(node, Program):
-            return "\n".join(self.pprint(decl) for decl in node.declarations)
-
-        elif isinstance(node, FunctionDef):
-            params = ", ".join(f"{self.pprint(param.type)} {param.name}" for param in node.params)
-            body = self.pprint(node.body)
-            return f"{self.pprint(node.return_type)} {node.name}({params}) {body}"
-
-        elif isinstance(node, VarDecl):
-            s = f"{self.pprint(node.type)} {node.name}"
-            if node.initializer:
-                s += f" = {self.pprint(node.initializer)}"
-            s += ";"
-            return s
-
-        elif isinstance(node, PrimitiveType):
-            return node.name
-
-        elif isinstance(node, RecordType):
-            return node.name
-
-
-        elif isinstance(node, Block):
-            s = "{\n"
-            self.indent()
-            count = len(node.statements)
-
-            for i, stmt in enumerate(node.statements):
-                is_last = (i == count - 1)
-
-                # Automatically return the last expression
-                if is_last and isinstance(stmt, ExprStmt):
-                    s += self.write_indent() + "return " + self.pprint(stmt.expression) + ";\n"
-                else:
-                    s += self.write_indent() + self.pprint(stmt) + "\n"
-
-            self.dedent()
-            s += self.write_indent() + "}"
-            return s
-
-        elif isinstance(node, ExprStmt):
-            return self.pprint(node.expression) + ";"
-
-        elif isinstance(node, Assignment):
-            return f"{self.pprint(node.lvalue)} = {self.pprint(node.rvalue)}"
-
-        elif isinstance(node, OperatorCall):
-            if node.operator == "[]":
-                return f"{self.pprint(node.operands[0])}[{self.pprint(node.operands[1])}]"
-            elif len(node.operands) == 2:
-                return f"{self.pprint(node.operands[0])} {node.operator} {self.pprint(node.operands[1])}"
-            else:
-                return f"{node.operator}({', '.join(self.pprint(op) for op in node.operands)})"
-
-        elif isinstance(node, FunctionCall):
-            args = ", ".join(self.pprint(arg) for arg in node.arguments)
-            return f"{self.pprint(node.function)}({args})"
-
-        elif isinstance(node, VarRef):
-            return node.name
-
-        elif isinstance(node, IfExpr):
-            s = f"if ({self.pprint(node.condition)}) {self.pprint(node.then_expr)}"
-            if node.else_expr:
-                s += f" else {self.pprint(node.else_expr)}"
-            return s
-
-        elif isinstance(node, WhileLoop):
-            return f"while ({self.pprint(node.condition)}) {self.pprint(node.body)}"
+        out: List[str] = []
+        self._emit(node, out)
+        return "".join(out)
+
+    def _emit(self, node, out: List[str]) -> None:
+        # one dict hit per node instead of walking an isinstance chain
+        handler = self._DISPATCH.get(type(node)) or self._handler_for_subclass(type(node))
+        if handler is None:
+            raise ValueError(f"Unknown AST node type: {type(node).__name__}")
+        handler(self, node, out)
+
+    @classmethod
+    def _handler_for_subclass(cls, node_cls: type):
+        # a subclass of a node type prints like its nearest handled base;
+        # the result is cached so the next node of this class takes one dict hit
+        for base in node_cls.__mro__[1:]:
+            handler = cls._DISPATCH.get(base)
+            if handler is not None:
+                cls._DISPATCH[node_cls] = handler
+                return handler
+        return None
+
+    def _emit_joined(self, nodes, out: List[str]) -> None:
+        for i, node in enumerate(nodes):
+            if i:
+                out.append(", ")
+            self._emit(node, out)
 
-        elif isinstance(node, PrimitiveLiteral):
-            if isinstance(node.value, str):
-                return f'"{node.value}"'
-            elif isinstance(node.value, bool):
-                return "true" if node.value else "false"
+    # ------------------------
+    # Node handlers, each appending its text to out
+    # ------------------------
+    def _pp_program(self, node: Program, out: List[str]) -> None:
+        for i, decl in enumerate(node.declarations):
+            if i:
+                out.append("\n")
+            self._emit(decl, out)
+
+    def _pp_function_def(self, node: FunctionDef, out: List[str]) -> None:
+        self._emit(node.return_type, out)
+        out.append(f" {node.name}(")
+        for i, param in enumerate(node.params):
+            if i:
+                out.append(", ")
+            self._emit(param.type, out)
+            out.append(f" {param.name}")
+        out.append(") ")
+        self._emit(node.body, out)
+
+    def _pp_var_decl(self, node: VarDecl, out: List[str]) -> None:
+        self._emit(node.type, out)
+        out.append(f" {node.name}")
+        if node.initializer:
+            out.append(" = ")
+            self._emit(node.initializer, out)
+        out.append(";")
+
+    def _pp_type_name(self, node: PrimitiveType | RecordType, out: List[str]) -> None:
+        out.append(node.name)
+
+    def _pp_block(self, node: Block, out: List[str]) -> None:
+        out.append("{\n")
+        self.indent()
+        count = len(node.statements)
+        # nested blocks restore the level they found, so one lookup serves every statement
+        indent = self.write_indent()
+
+        for i, stmt in enumerate(node.statements):
+            out.append(indent)
+            # Automatically return the last expression
+            if i == count - 1 and isinstance(stmt, ExprStmt):
+                out.append("return ")
+                self._emit(stmt.expression, out)
+                out.append(";\n")
             else:
-                return str(node.value)
-
+                self._emit(stmt, out)
+                out.append("\n")
+
+        self.dedent()
+        out.append(self.write_indent())
+        out.append("}")
+
+    def _pp_expr_stmt(self, node: ExprStmt, out: List[str]) -> None:
+        self._emit(node.expression, out)
+        out.append(";")
+
+    def _pp_assignment(self, node: Assignment, out: List[str]) -> None:
+        self._emit(node.lvalue, out)
+        out.append(" = ")
+        self._emit(node.rvalue, out)
+
+    def _pp_operator_call(self, node: OperatorCall, out: List[str]) -> None:
+        if node.operator == "[]":
+            self._emit(node.operands[0], out)
+            out.append("[")
+            self._emit(node.operands[1], out)
+            out.append("]")
+        elif len(node.operands) == 2:
+            self._emit(node.operands[0], out)
+            out.append(f" {node.operator} ")
+            self._emit(node.operands[1], out)
         else:
-            raise ValueError(f"Unknown AST node type: {type(node).__name__}")
+            out.append(f"{node.operator}(")
+            self._emit_joined(node.operands, out)
+            out.append(")")
+
+    def _pp_function_call(self, node: FunctionCall, out: List[str]) -> None:
+        self._emit(node.function, out)
+        out.append("(")
+        self._emit_joined(node.arguments, out)
+        out.append(")")
+
+    def _pp_var_ref(self, node: VarRef, out: List[str]) -> None:
+        out.append(node.name)
+
+    def _pp_if_expr(self, node: IfExpr, out: List[str]) -> None:
+        out.append("if (")
+        self._emit(node.condition, out)
+        out.append(") ")
+        self._emit(node.then_expr, out)
+        if node.else_expr:
+            out.append(" else ")
+            self._emit(node.else_expr, out)
+
+    def _pp_while_loop(self, node: WhileLoop, out: List[str]) -> None:
+        out.append("while (")
+        self._emit(node.condition, out)
+        out.append(") ")
+        self._emit(node.body, out)
+
+    def _pp_primitive_literal(self, node: PrimitiveLiteral, out: List[str]) -> None:
+        if isinstance(node.value, str):
+            out.append(f'"{node.value}"')
+        elif isinstance(node.value, bool):
+            out.append("true" if node.value else "false")
+        else:
+            out.append(str(node.value))
+
+    _DISPATCH = {
+        Program: _pp_program,
+        FunctionDef: _pp_function_def,
+        VarDecl: _pp_var_decl,
+        PrimitiveType: _pp_type_name,
+        RecordType: _pp_type_name,
+        Block: _pp_block,
+        ExprStmt: _pp_expr_stmt,
+        Assignment: _pp_assignment,
+        OperatorCall: _pp_operator_call,
+        FunctionCall: _pp_function_call,
+        VarRef: _pp_var_ref,
+        IfExpr: _pp_if_expr,
+        WhileLoop: _pp_while_loop,
+        PrimitiveLiteral: _pp_primitive_literal,
+    }
 
 
 if __name__ == '__main__':
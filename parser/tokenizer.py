@@ -1,7 +1,8 @@
 import re
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from enum import Enum, auto
-from typing import List
+from typing import Iterable, Iterator, List, Optional
 
 # ------------------------
 # Token Types
@@ -20,11 +21,15 @@ class TokenType(Enum):
     # End of file
     EOF = auto()
 
-@dataclass
+# Slotted: no per-token __dict__, which is most of a token's memory on large sources
+@dataclass(slots=True)
 class Token:
     type: TokenType
     value: str
     pos: int
+    # binary operator precedence, -1 for every other token (see PRECEDENCE);
+    # derived from type and value, so it takes no part in equality
+    prec: int = field(default=-1, compare=False)
 
     def __repr__(self):
         return f"Token({self.type.name}, {self.value!r}, pos={self.pos})"
@@ -38,12 +43,16 @@ TOKEN_SPEC = [
     ("MCOMMENT",   r"/\*.*?\*/"),
     ("NUMBER",     r"\d+(\.\d+)?([eE][+-]?\d+)?"),
     ("CHAR",       r"'(\\.|[^\\'])'"),
-    ("STRING",     r"\"(\\.|[^\"])*\""),
+    # Unambiguous form of "(\\.|[^"])*"; a quote it can't match goes to QUOTE below
+    ("STRING",     r"\"(?:[^\"\\]|\\.)*\""),
+    # Keywords are whole identifiers only; KEYWORDS below lists the same words
+    ("KW",         r"(?:int|float|char|bool|unit|if|else|while|for|return|true|false|sizeof)(?![A-Za-z0-9_])"),
     ("ID",         r"[A-Za-z_][A-Za-z0-9_]*"),
     # Multi-char operators
     ("OP",         r"==|!=|<=|>=|\+\+|--|\+=|-=|\*=|/=|&&|\|\||<<|>>|->"),
     # Single-character operators & punctuation
     ("SINGLE",     r"[+\-*/%<>=!&|^~\[\]\(\)\{\},;.:]"),
+    ("QUOTE",      r"\""),
 ]
 
 MASTER_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TOKEN_SPEC), re.S)
@@ -51,51 +60,141 @@ MASTER_RE = re.compile("|".join(f"(?P<{name}>{pattern})" for name, pattern in TO
 # ------------------------
 # Keywords
 # ------------------------
-KEYWORDS = {
+KEYWORDS = frozenset({
     "int", "float", "char", "bool", "unit",
     "if", "else", "while", "for", "return",
     "true", "false", "sizeof"
+})
+
+# Matched text -> the one shared string for it, so keyword and operator values are
+# interned and the parser's value comparisons short-circuit on identity
+_KEYWORD_VALUES = {k: k for k in KEYWORDS}
+_OP_VALUES = {op: op for op in (
+    "==", "!=", "<=", ">=", "++", "--", "+=", "-=", "*=", "/=", "&&", "||", "<<", ">>", "->",
+    *"+-*/%<>=!&|^~[](){},;.:",
+)}
+
+# Binary operator precedence, resolved once per token here so the parser's
+# precedence climbing reads one int instead of testing type and value
+PRECEDENCE = {
+    "=": 1,
+    "||": 2,
+    "&&": 3,
+    "==": 4, "!=": 4,
+    "<": 5, "<=": 5, ">": 5, ">=": 5,
+    "+": 6, "-": 6,
+    "*": 7, "/": 7, "%": 7,
 }
 
+# Pattern group -> token type; groups missing here (whitespace, comments) are skipped
+_KIND_TYPES = {
+    "NUMBER": TokenType.NUMBER,
+    "CHAR": TokenType.CHAR,
+    "STRING": TokenType.STRING,
+    "OP": TokenType.OP,
+    "SINGLE": TokenType.OP,
+}
+_SKIPPED = frozenset({"WHITESPACE", "COMMENT", "MCOMMENT"})
+
+
+def _string_ends(code: str) -> List[Optional[int]]:
+    """
+    ends[i] is where "(\\.|[^"])*" ends when its body starts at i, or None if it can't match.
+
+    Backtracking that pattern is exponential in the number of backslashes when no
+    closing quote is found; the same search memoized right to left is linear.
+    """
+    n = len(code)
+    ends: List[Optional[int]] = [None] * (n + 2)
+    for i in range(n - 1, -1, -1):
+        c = code[i]
+        end: Optional[int] = None
+        # same order the regex engine tries: an escape pair, any non-quote, closing quote
+        if c == "\\" and i + 1 < n:
+            end = ends[i + 2]
+        if end is None and c != '"':
+            end = ends[i + 1]
+        if end is None and c == '"':
+            end = i + 1
+        ends[i] = end
+    return ends
+
 # ------------------------
 # Tokenizer
 # ------------------------
-def tokenize(code: str) -> List[Token]:
-    tokens: List[Token] = []
+def iter_tokens(code: str) -> Iterator[Token]:
+    """Yields the tokens of code one at a time, ending with EOF."""
+    kw, ident = TokenType.KW, TokenType.ID
+    string_ends: Optional[List[Optional[int]]] = None
+    pos = 0
 
-    for m in MASTER_RE.finditer(code):
-        kind = m.lastgroup
-        value = m.group()
-        pos = m.start()
+    # MASTER_RE tries the patterns in TOKEN_SPEC order at each position, so one
+    # finditer pass is faster than matching each pattern separately
+    while True:
+        for m in MASTER_RE.finditer(code, pos):
+            kind = m.lastgroup
 
-        # Skip whitespace and comments
-        if kind in {"WHITESPACE", "COMMENT", "MCOMMENT"}:
-            continue
+            # Skip whitespace and comments before touching the matched text
+            if kind in _SKIPPED:
+                continue
 
-        # Keywords vs identifiers
-        elif kind == "ID":
-            if value in KEYWORDS:
-                tokens.append(Token(TokenType.KW, value, pos))
+            # Keywords are told apart from identifiers by the regex itself
+            if kind == "ID":
+                # one shared string per name, so the dicts keyed by names
+                # downstream compare them by identity
+                yield Token(ident, sys.intern(m.group()), m.start())
+            elif kind == "KW":
+                yield Token(kw, _KEYWORD_VALUES[m.group()], m.start())
+            elif kind == "QUOTE":
+                # a string only found by backtracking, e.g. one ending in a lone backslash
+                start = m.start()
+                if string_ends is None:
+                    string_ends = _string_ends(code)
+                end = string_ends[start + 1]
+                if end is None:
+                    continue
+                yield Token(TokenType.STRING, code[start:end], start)
+                pos = end
+                break
+            elif kind == "OP" or kind == "SINGLE":
+                value = m.group()
+                yield Token(TokenType.OP, _OP_VALUES.get(value, value), m.start(), PRECEDENCE.get(value, -1))
             else:
-                tokens.append(Token(TokenType.ID, value, pos))
+                # Literals
+                yield Token(_KIND_TYPES[kind], m.group(), m.start())
+        else:
+            break
 
-        # Literals
-        elif kind == "NUMBER":
-            tokens.append(Token(TokenType.NUMBER, value, pos))
-        elif kind == "CHAR":
-            tokens.append(Token(TokenType.CHAR, value, pos))
-        elif kind == "STRING":
-            tokens.append(Token(TokenType.STRING, value, pos))
+    yield Token(TokenType.EOF, "", len(code))
 
-        # Operators
-        elif kind in {"OP", "SINGLE"}:
-            tokens.append(Token(TokenType.OP, value, pos))
 
-        else:
-            raise SyntaxError(f"Unknown token kind {kind} at position {pos}")
+def tokenize(code: str) -> List[Token]:
+    return list(iter_tokens(code))
+
+
+class TokenStream:
+    """
+    Tokens pulled from an iterator as the parser's cursor reaches them, so a
+    source is never held as a full token list. Only the token at the cursor is
+    kept: indexing may move forward but never back.
+    """
+    __slots__ = ("_tokens", "_index", "_token")
+
+    def __init__(self, tokens: Iterable[Token]):
+        self._tokens = iter(tokens)
+        self._index = 0
+        self._token = next(self._tokens)
 
-    tokens.append(Token(TokenType.EOF, "", len(code)))
-    return tokens
+    def __getitem__(self, index: int) -> Token:
+        if index != self._index:
+            if index < self._index:
+                raise IndexError("token stream can't move back")
+            for _ in range(index - self._index):
+                self._token = next(self._tokens, None)
+                if self._token is None:
+                    raise IndexError("token stream exhausted")
+            self._index = index
+        return self._token
 
 # ------------------------
 # Example usage
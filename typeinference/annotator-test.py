@@ -1,4 +1,6 @@
 import unittest
+from dataclasses import fields, is_dataclass
+
 import ast_nodes
 import type_annotator
 
@@ -28,6 +30,45 @@ VarDecl(name='x', type=Type(base_type=PrimitiveType(name='int'), dimension=0), m
 VarDecl(name='y', type=Type(base_type=PrimitiveType(name='int'), dimension=0), mutable=False, initializer=OperatorCall(operator='+', operands=[VarRef(name='x', type=Type(base_type=PrimitiveType(name='int'), dimension=0)), PrimitiveLiteral(value=1, type=Type(base_type=PrimitiveType(name='int'), dimension=0))], type=Type(base_type=PrimitiveType(name='int'), dimension=0)))
 ])"""
 
+# the comparison ignores whitespace differences
+clean_expected_small = "".join(expected_typed_ast_small.split())
+
+"""
+Writes repr(node) into out with no whitespace between tokens, so it can be
+compared to a whitespace-stripped expected repr without stripping the result.
+"""
+def _canonical(node, out):
+    if is_dataclass(node):
+        out.append(type(node).__name__)
+        out.append("(")
+        sep = ""
+        for f in fields(node):
+            if f.repr:
+                out.append(sep)
+                out.append(f.name)
+                out.append("=")
+                _canonical(getattr(node, f.name), out)
+                sep = ","
+        out.append(")")
+    elif isinstance(node, list):
+        out.append("[")
+        for i, item in enumerate(node):
+            if i:
+                out.append(",")
+            _canonical(item, out)
+        out.append("]")
+    elif isinstance(node, dict):
+        out.append("{")
+        for i, (key, value) in enumerate(node.items()):
+            if i:
+                out.append(",")
+            out.append(repr(key))
+            out.append(":")
+            _canonical(value, out)
+        out.append("}")
+    else:
+        out.append(repr(node))
+
 class TypeCheckerTests(unittest.TestCase):
     def setUp(self):
         self.env = {}
@@ -39,11 +80,9 @@ class TypeCheckerTests(unittest.TestCase):
     def test_small_ast(self):
         type_annotator.type_annotate_program(small_ast, self.env)
         self.maxDiff = None
-        result_str = repr(small_ast)
-        # ignore whitespace differences
-        clean_result = "".join(result_str.split())
-        clean_expected = "".join(expected_typed_ast_small.split())
-        self.assertEqual(clean_result, clean_expected)
+        buf = []
+        _canonical(small_ast, buf)
+        self.assertEqual("".join(buf), clean_expected_small)
 
     """
     Annotate a simple function definition.
@@ -281,5 +320,155 @@ class TypeCheckerTests(unittest.TestCase):
         self.assertIn("x", self.env)
         self.assertEqual(self.env["x"].base_type.name, "int")
 
+    """
+    The statements of a while loop's body are annotated.
+    x = { var i = 0; while (i < 3) { i = i + 1 }; i }
+    """
+    def test_while_body_annotation(self):
+        increment = ast_nodes.OperatorCall("+", [ast_nodes.VarRef("i"), ast_nodes.PrimitiveLiteral(1)])
+        block = ast_nodes.Block([
+            ast_nodes.DeclStmt(ast_nodes.VarDecl("i", None, True, ast_nodes.PrimitiveLiteral(0))),
+            ast_nodes.WhileLoop(
+                condition=ast_nodes.OperatorCall("<", [ast_nodes.VarRef("i"), ast_nodes.PrimitiveLiteral(3)]),
+                body=ast_nodes.Block([ast_nodes.Assignment(ast_nodes.VarRef("i"), increment)])
+            ),
+            ast_nodes.ExprStmt(ast_nodes.VarRef("i"))
+        ])
+        program = ast_nodes.Program(declarations=[
+            ast_nodes.VarDecl(name="x", type=None, mutable=False, initializer=block)
+        ])
+
+        type_annotator.type_annotate_program(program, self.env)
+        int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        self.assertEqual(increment.type, int_type)
+        self.assertEqual(block.statements[1].body.type, ast_nodes.Type(ast_nodes.PrimitiveType("unit"), 0))
+        self.assertEqual(self.env["x"], int_type)
+
+    """
+    Every node of a long operator chain is annotated.
+    x = ((1 + 1) + 1) + ... 500 deep
+    """
+    def test_deep_operator_chain(self):
+        nodes = [ast_nodes.PrimitiveLiteral(1)]
+        for _ in range(500):
+            nodes.append(ast_nodes.OperatorCall("+", [nodes[-1], ast_nodes.PrimitiveLiteral(1)]))
+        # a block keeps the program off the flat-program path
+        program = ast_nodes.Program(declarations=[
+            ast_nodes.VarDecl(name="x", type=None, mutable=False,
+                              initializer=ast_nodes.Block([ast_nodes.ExprStmt(nodes[-1])]))
+        ])
+
+        type_annotator.type_annotate_program(program, self.env)
+        int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        self.assertTrue(all(n.type == int_type for n in nodes))
+        self.assertEqual(self.env["x"], int_type)
+
+    """
+    Annotating function bodies in worker processes gives the serial annotation.
+    fn f0(Int x) -> Int { x + 0 } ... fn f7(Int x) -> Int { x + 7 }; y = f7(1)
+    """
+    def test_parallel_annotation_matches_serial(self):
+        def build():
+            int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+            decls = [
+                ast_nodes.FunctionDef(
+                    name=f"f{k}",
+                    params=[ast_nodes.VarDecl("x", int_type, False)],
+                    return_type=int_type,
+                    body=ast_nodes.Block([ast_nodes.ExprStmt(ast_nodes.OperatorCall(
+                        operator="+",
+                        operands=[ast_nodes.VarRef("x"), ast_nodes.PrimitiveLiteral(k)]
+                    ))])
+                )
+                for k in range(type_annotator.PARALLEL_MIN_FUNCTIONS)
+            ]
+            decls.append(ast_nodes.VarDecl(
+                name="y",
+                type=None,
+                mutable=False,
+                initializer=ast_nodes.FunctionCall(ast_nodes.VarRef(decls[-1].name), [ast_nodes.PrimitiveLiteral(1)])
+            ))
+            return ast_nodes.Program(declarations=decls)
+
+        serial = type_annotator.type_annotate_program(build(), {})
+        parallel = type_annotator.type_annotate_program(build(), self.env, workers=2)
+        self.assertEqual(repr(parallel), repr(serial))
+        self.assertEqual(self.env["y"].base_type.name, "int")
+
+    """
+    A failing body leaves env as the serial annotation leaves it: the names
+    declared after it are not bound.
+    fn bad(Int x) -> Int { missing }; fn f1(Int x) -> Int { x + 1 } ... f8
+    """
+    def test_parallel_annotation_error_matches_serial(self):
+        def build():
+            int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+            decls = [
+                ast_nodes.FunctionDef(
+                    name=f"f{k}" if k else "bad",
+                    params=[ast_nodes.VarDecl("x", int_type, False)],
+                    return_type=int_type,
+                    body=ast_nodes.Block([ast_nodes.ExprStmt(ast_nodes.OperatorCall(
+                        operator="+",
+                        operands=[ast_nodes.VarRef("x" if k else "missing"), ast_nodes.PrimitiveLiteral(k)]
+                    ))])
+                )
+                for k in range(type_annotator.PARALLEL_MIN_FUNCTIONS + 1)
+            ]
+            decls.append(ast_nodes.VarDecl(name="y", type=None, mutable=False, initializer=ast_nodes.PrimitiveLiteral(1)))
+            return ast_nodes.Program(declarations=decls)
+
+        serial_env = {}
+        with self.assertRaises(TypeError) as serial:
+            type_annotator.type_annotate_program(build(), serial_env)
+        with self.assertRaises(TypeError) as parallel:
+            type_annotator.type_annotate_program(build(), self.env, workers=2)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+        self.assertEqual(list(self.env), list(serial_env))
+
+    """
+    Annotating again with the same cache reuses the declarations that did not
+    change, in an environment that did not change, and annotates the rest.
+    var a = 1; Int n = 3; fn f(Int x) -> Int { x + a }, then a = 1.5 and a = 2
+    """
+    def test_cached_annotation(self):
+        def build(a_value):
+            int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+            return ast_nodes.Program(declarations=[
+                ast_nodes.VarDecl(name="a", type=None, mutable=False, initializer=ast_nodes.PrimitiveLiteral(a_value)),
+                ast_nodes.VarDecl(name="n", type=int_type, mutable=False, initializer=ast_nodes.PrimitiveLiteral(3)),
+                ast_nodes.FunctionDef(
+                    name="f",
+                    params=[ast_nodes.VarDecl("x", int_type, False)],
+                    return_type=int_type,
+                    body=ast_nodes.Block([ast_nodes.ExprStmt(ast_nodes.OperatorCall(
+                        operator="+",
+                        operands=[ast_nodes.VarRef("x"), ast_nodes.VarRef("a")]
+                    ))])
+                ),
+            ])
+
+        cache = {}
+        first = type_annotator.type_annotate_program(build(1), {}, cache=cache)
+        again = type_annotator.type_annotate_program(build(1), {}, cache=cache)
+        self.assertTrue(all(d is e for d, e in zip(first.declarations, again.declarations)))
+
+        # a's type changes, so f (annotated after it) is annotated again and fails
+        edited = build(1.5)
+        with self.assertRaises(TypeError):
+            type_annotator.type_annotate_program(edited, {}, cache=cache)
+        self.assertIsNot(edited.declarations[1], first.declarations[1])
+
+        edited = type_annotator.type_annotate_program(build(2), self.env, cache=cache)
+        self.assertEqual(repr(edited), repr(type_annotator.type_annotate_program(build(2), {})))
+        self.assertIs(edited.declarations[2], first.declarations[2])
+
+        # an entry found under the right key but annotated in other bindings
+        # (a fingerprint collision) is not reused
+        for key, (bindings, decl) in list(cache.items()):
+            cache[key] = ({"a": (ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0), None)}, decl)
+        again = type_annotator.type_annotate_program(build(1), {}, cache=cache)
+        self.assertFalse(any(d is e for d, e in zip(first.declarations[1:], again.declarations[1:])))
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
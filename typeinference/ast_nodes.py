@@ -1,15 +1,16 @@
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from typing import Optional
 
 
 # Top-level container
-@dataclass
+@dataclass(slots=True)
 class Program:
     declarations: list['Declaration']
 
 
 # Declarations & Definitions
-@dataclass
+@dataclass(slots=True)
 class VarDecl:
     name: str
     type: 'Type'
@@ -18,7 +19,7 @@ class VarDecl:
 
 
 # I thought about it some more, and you are welcome to use VarDecl + LambdaLiteral instead.
-@dataclass
+@dataclass(slots=True)
 class FunctionDef:
     name: str
     # Parameters with initializers do not need to be supported.
@@ -26,62 +27,149 @@ class FunctionDef:
     params: list[VarDecl]
     return_type: 'Type'
     body: 'Expression'
+    type: Optional['Type'] = field(default=None, init=False, repr=False, compare=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordTypeDecl:
     name: str
     fields: list[VarDecl]
+    type: Optional['Type'] = field(default=None, init=False, repr=False, compare=False)
 
 
 Declaration = FunctionDef | VarDecl | RecordTypeDecl
 
 
 # Types
-@dataclass
+# Types are never mutated once built, so they hash by value and can key
+# dicts and sets.
+@dataclass(slots=True)
 class PrimitiveType:
     name: str  # unit, int, float, bool, etc.
 
+    def __post_init__(self):
+        # one string object per type name, however the name was built
+        # (parsed source, literals), so equal names compare by identity
+        self.name = sys.intern(self.name)
 
-@dataclass
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.name is other.name
+
+    def __hash__(self):
+        return hash(self.name)
+
+    def __reduce__(self):
+        # unpickle through __init__ so the name is interned in this process too
+        return PrimitiveType, (self.name,)
+
+
+@dataclass(slots=True)
 class RecordType:
     name: str
+    # attached by the annotator to the type of a record declaration; records
+    # still compare by name alone
+    fields: Optional[dict[str, 'Type']] = field(default=None, init=False, repr=False, compare=False)
 
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.name == other.name
 
-@dataclass
+    def __hash__(self):
+        return hash(self.name)
+
+
+@dataclass(slots=True)
 class FunctionType:
     param_types: list['Type']
     return_type: 'Type'
+    # base types of the parameters, read once per call by the type checker
+    param_base_types: tuple = field(init=False, repr=False, compare=False)
+    # the whole signature as nested tuples of names and dimensions, so two
+    # function types compare in C instead of Type by Type
+    _key: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # an untyped parameter (None) has no base type yet
+        self.param_base_types = tuple(getattr(p, "base_type", None) for p in self.param_types)
+        self._key = (tuple(_type_key(p) for p in self.param_types), _type_key(self.return_type))
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self):
+        return hash(self._key)
 
 
 BaseType = PrimitiveType | RecordType | FunctionType
 
-@dataclass
+
+# What a Type compares by, built from strings and ints only
+def _type_key(t):
+    if t is None:
+        return None
+    base_type = t.base_type
+    if base_type.__class__ is FunctionType:
+        return base_type._key, t.dimension
+    if base_type.__class__ is RecordType:
+        return ("record", base_type.name), t.dimension
+    return base_type.name, t.dimension
+
+@dataclass(slots=True, weakref_slot=True)
 class Type:
     base_type: BaseType
     dimension: int
+    _hash: Optional[int] = field(default=None, init=False, repr=False, compare=False)
+
+    def __eq__(self, other):
+        # shared type instances compare without walking their fields
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.dimension == other.dimension and self.base_type == other.base_type
+
+    def __hash__(self):
+        h = self._hash
+        if h is None:
+            h = self._hash = hash((self.base_type, self.dimension))
+        return h
+
+    def __reduce__(self):
+        # string hashes differ between processes, so the cached hash is not pickled
+        return Type, (self.base_type, self.dimension)
 
 
 # Statements
-@dataclass
+@dataclass(slots=True)
 class Assignment:
     lvalue: 'PlaceExpression'
     rvalue: 'Expression'
 
 
-@dataclass
+@dataclass(slots=True)
 class WhileLoop:
     condition: 'Expression'
     body: 'Statement'
 
 
-@dataclass
+@dataclass(slots=True)
 class DeclStmt:
     # No need to support record type declarations.
     declaration: Declaration
 
 
-@dataclass
+@dataclass(slots=True)
 class ExprStmt:
     expression: 'Expression'
 
@@ -90,13 +178,13 @@ Statement = Assignment | WhileLoop | DeclStmt | ExprStmt
 
 
 # Place expressions
-@dataclass
+@dataclass(slots=True)
 class VarRef:
     name: str
     type: Optional['Type'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FieldRef:
     record: 'Expression'
     field_name: str
@@ -107,54 +195,61 @@ PlaceExpression = VarRef | FieldRef
 
 
 # Expressions
-@dataclass
+@dataclass(slots=True)
 class PrimitiveLiteral:
     value: int | float | bool
     type: Optional['Type'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ArrayLiteral:
     value: list['Expression']
+    type: Optional['Type'] = field(default=None, init=False, repr=False, compare=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class LambdaLiteral:
     params: list[VarDecl]
     body: 'Expression'
+    type: Optional['Type'] = field(default=None, init=False, repr=False, compare=False)
 
 
-@dataclass
+@dataclass(slots=True)
 class RecordLiteral:
     type: str
     field_values: dict[str, 'Expression']
+    # flat (name, expression) pairs the type checker walks; left out of repr and ==
+    field_items: tuple = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.field_items = tuple(self.field_values.items())
 
 
 Literal = PrimitiveLiteral | ArrayLiteral | LambdaLiteral | RecordLiteral
 
 
-@dataclass
+@dataclass(slots=True)
 class FunctionCall:
     function: 'Expression'
     arguments: list['Expression']
     type: Optional['Type'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class OperatorCall:
     operator: str
     operands: list['Expression']
     type: Optional['Type'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class Block:
     # Final statement is the result of the block, if it is an expression statement.
     statements: list[Statement]
     type: Optional['Type'] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class IfExpr:
     condition: 'Expression'
     then_expr: 'Expression'
@@ -82,6 +82,32 @@ class TypeCheckerTests(unittest.TestCase):
         expected = ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0)
         self.assertEqual(result, expected)
 
+    """
+    Check chained field access through a record-typed field.
+    l: Line, Line { start: Point } -> l.start.x : float^0
+    """
+    def test_chained_field_ref(self):
+        point_record = ast_nodes.RecordType("Point")
+        point_record.fields = {
+            "x": ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0),
+            "y": ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0)
+        }
+        line_record = ast_nodes.RecordType("Line")
+        line_record.fields = {"start": ast_nodes.Type(point_record, 0)}
+
+        env = {"Point": ast_nodes.Type(point_record, 0),
+               "Line": ast_nodes.Type(line_record, 0),
+               "l": ast_nodes.Type(ast_nodes.RecordType("Line"), 0)}
+
+        field_ref = ast_nodes.FieldRef(
+            record=ast_nodes.FieldRef(record=ast_nodes.VarRef("l"), field_name="start"),
+            field_name="x"
+        )
+
+        result = type_checker.infer_expression_type(field_ref, env)
+        expected = ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0)
+        self.assertEqual(result, expected)
+
     """
     Check function call without broadcasting.
     pow(3, 2) -> int
@@ -211,6 +237,18 @@ class TypeCheckerTests(unittest.TestCase):
         expected = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 2)
         self.assertEqual(result, expected)
 
+    """
+    Check mixing elements of different dimensions is rejected.
+    [1, [2]] -> TypeError
+    """
+    def test_array_literal_mixed_dimension(self):
+        node = ast_nodes.ArrayLiteral([
+            ast_nodes.PrimitiveLiteral(1),
+            ast_nodes.ArrayLiteral([ast_nodes.PrimitiveLiteral(2)])
+        ])
+        with self.assertRaisesRegex(TypeError, "Array types are not homogeneous"):
+            type_checker.infer_expression_type(node, self.env)
+
     """
     Check if-expression where both branches return same type.
     if (true) 1 else 2 -> int^0
@@ -260,5 +298,110 @@ class TypeCheckerTests(unittest.TestCase):
         expected = ast_nodes.Type(ast_nodes.PrimitiveType("float"), 1)
         self.assertEqual(result, expected)
 
+    """
+    Check a subtree shared by both operands is typed once, not once per path.
+    x + x, nested 100 deep -> int^0
+    """
+    def test_shared_subtrees(self):
+        node = ast_nodes.VarRef("x")
+        for _ in range(100):
+            node = ast_nodes.OperatorCall("+", [node, node])
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)}
+        result = type_checker.infer_expression_type(node, env)
+        expected = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        self.assertEqual(result, expected)
+
+    """
+    Check a shared node is retyped after a declaration shadows its variable.
+    { x; float x = 1.0; x } with both x the same node -> float^0
+    """
+    def test_shared_node_after_shadowing(self):
+        x = ast_nodes.VarRef("x")
+        node = ast_nodes.Block([
+            ast_nodes.ExprStmt(x),
+            ast_nodes.DeclStmt(ast_nodes.VarDecl("x", ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0), True,
+                                                 ast_nodes.PrimitiveLiteral(1.0))),
+            ast_nodes.ExprStmt(x),
+        ])
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)}
+        result = type_checker.infer_expression_type(node, env)
+        expected = ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0)
+        self.assertEqual(result, expected)
+
+    """
+    Check nesting far deeper than the recursion limit is typed.
+    ((x + 1) + 1) + ... 5000 deep -> int^0
+    """
+    def test_deep_nesting(self):
+        node = ast_nodes.VarRef("x")
+        for _ in range(5000):
+            node = ast_nodes.OperatorCall("+", [node, ast_nodes.PrimitiveLiteral(1)])
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)}
+        result = type_checker.infer_expression_type(node, env)
+        expected = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        self.assertEqual(result, expected)
+
+    """
+    Check a subclass of a node class is typed like that node class.
+    """
+    def test_node_subclass(self):
+        class TracedVarRef(ast_nodes.VarRef):
+            pass
+
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)}
+        result = type_checker.infer_expression_type(TracedVarRef("x"), env)
+        expected = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        self.assertEqual(result, expected)
+
+    """
+    Check equal types are built once and shared.
+    [1, 2] and x + y (x, y: [int]) -> the same int^1 object
+    """
+    def test_inferred_types_are_shared(self):
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 1),
+               "y": ast_nodes.Type(ast_nodes.PrimitiveType("int"), 1)}
+        array = ast_nodes.ArrayLiteral([ast_nodes.PrimitiveLiteral(1), ast_nodes.PrimitiveLiteral(2)])
+        total = ast_nodes.OperatorCall("+", [ast_nodes.VarRef("x"), ast_nodes.VarRef("y")])
+        self.assertIs(type_checker.infer_expression_type(array, env),
+                      type_checker.infer_expression_type(total, env))
+        self.assertIs(type_checker.mk_type(ast_nodes.PrimitiveType("int"), 1),
+                      type_checker.infer_expression_type(array, env))
+
+    """
+    Check binary operators broadcast to the larger dimension and reject mixed base types.
+    x < 1 (x: [float]) -> bool^1, x + 1 -> error
+    """
+    def test_binary_operator_call(self):
+        env = {"x": ast_nodes.Type(ast_nodes.PrimitiveType("float"), 1)}
+        node = ast_nodes.OperatorCall("<", [ast_nodes.VarRef("x"), ast_nodes.PrimitiveLiteral(1.0)])
+        result = type_checker.infer_expression_type(node, env)
+        self.assertEqual(result, ast_nodes.Type(ast_nodes.PrimitiveType("bool"), 1))
+
+        node = ast_nodes.OperatorCall("+", [ast_nodes.VarRef("x"), ast_nodes.PrimitiveLiteral(1)])
+        with self.assertRaisesRegex(TypeError, "Operand types do not match"):
+            type_checker.infer_expression_type(node, env)
+
+    """
+    Check a record declared inside a block exposes its fields.
+    { record R { q: int }; r = R { q: 1 }; r.q } -> int
+    """
+    def test_block_record_field_ref(self):
+        int_type = ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
+        block = ast_nodes.Block([
+            ast_nodes.DeclStmt(ast_nodes.RecordTypeDecl("R", [ast_nodes.VarDecl("q", int_type, False)])),
+            ast_nodes.DeclStmt(ast_nodes.VarDecl("r", None, False,
+                                                 ast_nodes.RecordLiteral("R", {"q": ast_nodes.PrimitiveLiteral(1)}))),
+            ast_nodes.ExprStmt(ast_nodes.FieldRef(ast_nodes.VarRef("r"), "q")),
+        ])
+        result = type_checker.infer_expression_type(block, self.env)
+        self.assertEqual(result, int_type)
+
+        # a field-less R type kept alive elsewhere must not stand in for the declared one
+        literal_type = type_checker.infer_expression_type(
+            ast_nodes.RecordLiteral("R", {"q": ast_nodes.PrimitiveLiteral(1)}), {})
+        result = type_checker.infer_expression_type(block, self.env)
+        self.assertEqual(result, int_type)
+        self.assertIsNone(literal_type.base_type.fields)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
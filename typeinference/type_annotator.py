@@ -1,5 +1,12 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import fields
+
 import type_checker, ast_nodes
 
+# Below this many function bodies, starting worker processes costs more than
+# annotating the bodies in this one
+PARALLEL_MIN_FUNCTIONS = 8
+
 """
 Entry point function. Goes through all of the program declarations and calls
 the annotation function.
@@ -7,96 +14,352 @@ the annotation function.
 Args:
   program: ast_nodes.Program - The AST to be annotated. 
   env: dict[str, ast_nodes.Type] - The environment where program variables are recorded.
+  workers: int | None - Worker processes for function bodies. None annotates serially.
+  cache: dict | None - Declarations annotated by earlier calls given the same dict.
+      Unchanged declarations in an unchanged environment are taken from it.
 
 Returns:
   program: The Typed AST (TAST) of the program.
 """
-def type_annotate_program(program, env=None):
+def type_annotate_program(program, env=None, workers=None, cache=None):
     if env is None:
         env = {}
+    if cache is not None:
+        _annotate_program_cached(program, env, cache)
+        return program
+    if _is_flat_program(program):
+        _annotate_flat_program(program, env)
+        return program
+    if workers is not None and sum(
+            type(d) is ast_nodes.FunctionDef for d in program.declarations) >= PARALLEL_MIN_FUNCTIONS:
+        _annotate_program_parallel(program, env, workers)
+        return program
+    memo = type_checker.TypeMemo(annotate=True)
     for decl in program.declarations:
-        annotate_declaration(decl, env)
+        annotate_declaration(decl, env, memo)
     return program
 
+# Initializer nodes that have no children
+_LEAF_NODES = (ast_nodes.PrimitiveLiteral, ast_nodes.VarRef)
+
+def _is_flat_initializer(initializer):
+    if initializer is None or type(initializer) in _LEAF_NODES:
+        return True
+    return (type(initializer) is ast_nodes.OperatorCall
+            and all(type(o) in _LEAF_NODES for o in initializer.operands))
+
+"""
+Checks for the common shape of program: record types and variables whose
+initializers are a leaf, or an operator over leaves.
+
+Args:
+  program: ast_nodes.Program - The AST in question.
+
+Returns:
+  bool: Whether _annotate_flat_program can annotate it.
+"""
+def _is_flat_program(program):
+    for decl in program.declarations:
+        if type(decl) is ast_nodes.VarDecl:
+            if not _is_flat_initializer(decl.initializer):
+                return False
+        elif type(decl) is not ast_nodes.RecordTypeDecl:
+            return False
+    return True
+
+"""
+Annotates a program accepted by _is_flat_program in one loop. Each leaf is
+typed once and the operator's type is computed from those types, instead of
+retyping the operands as part of the operator. Annotations and errors are
+the same as annotate_declaration's.
+
+Args:
+  program: ast_nodes.Program - The AST to be annotated.
+  env: dict[str, ast_nodes.Type] - The environment where program variables are recorded.
+"""
+def _annotate_flat_program(program, env):
+    infer_leaf_type = type_checker.infer_leaf_type
+    for decl in program.declarations:
+        if type(decl) is ast_nodes.RecordTypeDecl:
+            annotate_declaration(decl, env)
+            continue
+
+        name, declared_type, initializer = decl.name, decl.type, decl.initializer
+        if initializer is None:
+            env[name] = declared_type
+            decl.type = declared_type
+            continue
+
+        if type(initializer) is ast_nodes.OperatorCall:
+            operand_types = []
+            for o in initializer.operands:
+                o.type = infer_leaf_type(o, env)
+                operand_types.append(o.type)
+            inferred_type = type_checker.operator_type(initializer.operator, operand_types)
+        else:
+            inferred_type = infer_leaf_type(initializer, env)
+        initializer.type = inferred_type
+
+        if declared_type and inferred_type and (
+                inferred_type.base_type != declared_type.base_type or inferred_type.dimension != declared_type.dimension
+        ):
+            raise TypeError(f"Initializer type mismatch for '{name}': {inferred_type} | {declared_type}")
+        var_type = declared_type or inferred_type
+        if var_type is None:
+            raise TypeError(f"Cannot determine type of variable '{name}'")
+        env[name] = var_type
+        decl.type = var_type
+
+"""
+Annotates the program for a caller that annotates it again after edits
+(an editor, a REPL). A declaration is looked up in cache by its content and by
+the environment it is annotated in; on a hit the annotated declaration from
+the earlier call replaces it and its binding goes into env, without walking it.
+Anything else is annotated as usual and stored for the next call.
+
+The environment is fingerprinted as it grows, with one hash per binding, so
+an edit that leaves the types of earlier declarations as they were doesn't
+invalidate the declarations after it. The fingerprint only picks the entry;
+each entry keeps the bindings it was annotated under, and a hit is only taken
+when they equal the current ones, so a hash collision can't hand back a
+declaration annotated in another environment.
+
+Args:
+  program: ast_nodes.Program - The AST to be annotated.
+  env: dict[str, ast_nodes.Type] - The environment where program variables are recorded.
+  cache: dict[tuple[tuple, int], tuple[dict, ast_nodes.Declaration]] - Bindings and annotated declaration by key.
+"""
+def _annotate_program_cached(program, env, cache):
+    memo = type_checker.TypeMemo(annotate=True)
+    fingerprint = 0
+    # env as compared on a hit: records compare by name alone, so each
+    # binding carries its record fields too
+    bindings = {}
+    for name, t in env.items():
+        bindings[name] = binding = _binding(t)
+        fingerprint ^= hash((name, binding))
+
+    declarations = program.declarations
+    for i, decl in enumerate(declarations):
+        name = decl.name
+        # content before annotation: annotating sets the types this key leaves out
+        key = (_content_key(decl), fingerprint)
+        entry = cache.get(key)
+        if entry is not None and entry[0] == bindings:
+            annotated = entry[1]
+            declarations[i] = annotated
+            env[name] = annotated.type
+            memo.generation += 1
+        else:
+            snapshot = bindings.copy()
+            annotate_declaration(decl, env, memo)
+            cache[key] = (snapshot, decl)
+
+        previous = bindings.get(name, _UNBOUND)
+        if previous is not _UNBOUND:
+            fingerprint ^= hash((name, previous))
+        bindings[name] = binding = _binding(env[name])
+        fingerprint ^= hash((name, binding))
+
+_UNBOUND = object()
+
+# Field names making up the content of each AST node class, in declaration order
+_NODE_FIELDS = {}
+
+def _content_key(node):
+    # The node's content as one flat tuple: each node's class followed by its
+    # fields, walked with a stack so deep trees don't hit the recursion limit.
+    # Nodes are the unhashable dataclasses; everything hashable (types, literal
+    # values) goes in as a value, tagged with its class as 1 == 1.0 == True.
+    tokens = []
+    stack = [node]
+    while stack:
+        x = stack.pop()
+        cls = x.__class__
+        names = _NODE_FIELDS.get(cls)
+        if names is not None:
+            tokens.append(cls)
+            for name in names:
+                stack.append(getattr(x, name))
+        elif cls is str or x is None:
+            tokens.append(x)
+        elif cls is list:
+            tokens.append((list, len(x)))
+            stack.extend(x)
+        elif cls is dict:
+            tokens.append((dict, len(x)))
+            for k, v in x.items():
+                stack.append(v)
+                stack.append(k)
+        elif cls.__hash__ is None:
+            _NODE_FIELDS[cls] = tuple(f.name for f in fields(cls) if f.compare)
+            stack.append(x)
+        else:
+            tokens.append(cls)
+            tokens.append(x)
+    return tuple(tokens)
+
+def _binding(t):
+    fields = getattr(t.base_type, "fields", None) if t is not None else None
+    return t, tuple(fields.items()) if fields is not None else None
+
+"""
+Annotates the program's function bodies in worker processes. A body only reads
+the environment built by the declarations before it, so those are annotated
+here in order and each body is sent off with a copy of its environment. The
+annotated copies that come back replace the original bodies. Errors are raised
+in declaration order, as annotate_declaration would raise them, and env is left
+as the serial annotation leaves it: names bound after a failing body are unbound.
+
+Args:
+  program: ast_nodes.Program - The AST to be annotated.
+  env: dict[str, ast_nodes.Type] - The environment where program variables are recorded.
+  workers: int - The number of worker processes.
+"""
+def _annotate_program_parallel(program, env, workers):
+    pending = []
+    # (name, previous binding) per declaration, to undo the later ones
+    shadowed = []
+    error = None
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for decl in program.declarations:
+            shadowed.append((decl.name, env.get(decl.name, _UNBOUND)))
+            if type(decl) is not ast_nodes.FunctionDef:
+                try:
+                    annotate_declaration(decl, env)
+                except TypeError as e:
+                    # bodies declared before this one still raise first
+                    error = e
+                    break
+                continue
+
+            fn_type = _function_type(decl)
+            env[decl.name] = fn_type
+            # a snapshot: the body is pickled for the worker only after later declarations ran
+            local_env = _function_env(decl, env.copy())
+            pending.append((decl, fn_type, len(shadowed), pool.submit(annotate_expression, decl.body, local_env)))
+
+        try:
+            for decl, fn_type, bound, body in pending:
+                try:
+                    decl.body = body.result()
+                except Exception:
+                    _unbind(env, shadowed[bound:])
+                    raise
+                decl.type = fn_type
+        except BaseException:
+            pool.shutdown(cancel_futures=True)
+            raise
+    if error is not None:
+        raise error
+
+_UNBOUND = object()
+
+def _unbind(env, shadowed):
+    for name, previous in reversed(shadowed):
+        if previous is _UNBOUND:
+            env.pop(name, None)
+        else:
+            env[name] = previous
+
+def _function_type(fn):
+    # Assume that the param & return types are already provided
+    # by the partially typed AST
+    return type_checker.mk_type(
+        ast_nodes.FunctionType(
+            param_types=[p.type for p in fn.params],
+            return_type=fn.return_type,
+        ),
+        0)
+
+def _function_env(fn, env):
+    # Create local function environment so that local variables
+    # do not escape the scope. It reads through to env instead of copying it.
+    local_env = type_checker.child_scope(env)
+    for p in fn.params:
+        local_env[p.name] = p.type
+    return local_env
+
 """
 For each declaration in the program, annotate its type to the AST.
 
 Args: 
     declaration: ast_nodes.Declaration - The declaration in question.
     env: dict[str, ast_nodes.Type] - The environment where program variables are recorded. 
+    memo: type_checker.TypeMemo | None - Types already inferred, shared with the other declarations.
     
 Returns:
     None
 """
-def annotate_declaration(declaration: ast_nodes.Declaration, env: dict[str, ast_nodes.Type]):
-    match declaration:
-        case ast_nodes.VarDecl(name, declared_type, mutable, initializer):
-            if initializer:
-                # Recursively go down until leaf node level
-                initializer = annotate_expression(initializer, env)
-
-                # Get the type of the current expression
-                inferred_type = initializer.type
+def annotate_declaration(declaration: ast_nodes.Declaration, env: dict[str, ast_nodes.Type],
+                         memo: type_checker.TypeMemo | None = None):
+    if memo is None:
+        memo = type_checker.TypeMemo(annotate=True)
+    # One dict lookup on the exact node class picks the annotator
+    annotator = _DECLARATION_ANNOTATORS.get(type(declaration)) or _annotator_for(_DECLARATION_ANNOTATORS, declaration)
+    if annotator is not None:
+        annotator(declaration, env, memo)
 
-                # Check if declared & inferred values agree on dimension and type
-                if declared_type and inferred_type and (
-                        inferred_type.base_type != declared_type.base_type or inferred_type.dimension != declared_type.dimension
-                ):
-                    raise TypeError(f"Initializer type mismatch for '{name}': {inferred_type} | {declared_type}")
+def _annotate_var_decl(declaration, env, memo):
+    name, declared_type, initializer = declaration.name, declaration.type, declaration.initializer
+    if initializer:
+        # Recursively go down until leaf node level
+        initializer = annotate_expression(initializer, env, memo)
 
-                # Focus is placed on what is already in the AST (declared_type)
-                # But if the developer did not declare a type, rely on inference
-                var_type = declared_type or inferred_type
-                if var_type is None:
-                    raise TypeError(f"Cannot determine type of variable '{name}'")
+        # Get the type of the current expression
+        inferred_type = initializer.type
 
-                # Add the variable to environment
-                env[name] = var_type
+        # Check if declared & inferred values agree on dimension and type
+        if declared_type and inferred_type and (
+                inferred_type.base_type != declared_type.base_type or inferred_type.dimension != declared_type.dimension
+        ):
+            raise TypeError(f"Initializer type mismatch for '{name}': {inferred_type} | {declared_type}")
 
-                # Annotate the VarDecl node itself
-                setattr(declaration, "type", var_type)
-            else:
-                # Uninitialized variable, just store its declared type
-                env[name] = declared_type
-                setattr(declaration, "type", declared_type)
+        # Focus is placed on what is already in the AST (declared_type)
+        # But if the developer did not declare a type, rely on inference
+        var_type = declared_type or inferred_type
+        if var_type is None:
+            raise TypeError(f"Cannot determine type of variable '{name}'")
 
-        case ast_nodes.FunctionDef(name, params, return_type, body):
+        # Add the variable to environment
+        env[name] = var_type
+        memo.generation += 1
 
-            # Assume that the param & return types are already provided
-            # by the partially typed AST
-            fn_type = ast_nodes.Type(
-                ast_nodes.FunctionType(
-                    param_types=[p.type for p in params],
-                    return_type=return_type,
-                ),
-                0)
+        # Annotate the VarDecl node itself
+        declaration.type = var_type
+    else:
+        # Uninitialized variable, just store its declared type
+        env[name] = declared_type
+        memo.generation += 1
+        declaration.type = declared_type
 
-            # Add the function type to the environment for recursive calls
-            env[name] = fn_type
+def _annotate_function_def(declaration, env, memo):
+    fn_type = _function_type(declaration)
 
-            # Create local function environment so that local variables
-            # do not escape the score
-            local_env = env.copy()
-            for p in params:
-                local_env[p.name] = p.type
+    # Add the function type to the environment for recursive calls
+    env[declaration.name] = fn_type
+    memo.generation += 1
 
-            annotate_expression(body, local_env)
+    annotate_expression(declaration.body, _function_env(declaration, env), memo)
 
-            setattr(declaration, "type", fn_type)
+    declaration.type = fn_type
 
-        case ast_nodes.RecordTypeDecl(name, fields):
-            # Assume field names & types are already provided in the
-            # partially typed AST
-            field_dict = {f.name: f.type for f in fields}
+def _annotate_record_type_decl(declaration, env, memo):
+    name = declaration.name
+    # Assume field names & types are already provided in the
+    # partially typed AST
+    field_dict = {f.name: f.type for f in declaration.fields}
 
-            # Create a RecordType and attach its fields
-            record_type = ast_nodes.RecordType(name)
-            setattr(record_type, "fields", field_dict)
+    # Create a RecordType and attach its fields
+    record_type = ast_nodes.RecordType(name)
+    record_type.fields = field_dict
 
-            env[name] = ast_nodes.Type(record_type, 0)
+    # Not interned: the fields belong to this declaration's type alone
+    env[name] = ast_nodes.Type(record_type, 0)
+    memo.generation += 1
 
-            # Attach the type to the declaration node itself
-            setattr(declaration, "type", env[name])
+    # Attach the type to the declaration node itself
+    declaration.type = env[name]
 
 """
 Traversal only function. Figures out what kind of statement it is dealing
@@ -105,76 +368,65 @@ with, and calls either the expression annotation or itself.
 Args:
     stmt: The statement in question.
     env: The environment where program variables are recorded. 
+    memo: Types already inferred, shared with the rest of the program.
 """
-def annotate_statement(stmt, env):
-    if isinstance(stmt, ast_nodes.Assignment):
-        annotate_expression(stmt.lvalue, env)
-        annotate_expression(stmt.rvalue, env)
-    elif isinstance(stmt, ast_nodes.WhileLoop):
-        annotate_expression(stmt.condition, env)
-        annotate_statement(stmt.body, env)
-    elif isinstance(stmt, ast_nodes.DeclStmt):
-        annotate_declaration(stmt.declaration, env)
-    elif isinstance(stmt, ast_nodes.ExprStmt):
-        annotate_expression(stmt.expression, env)
+def annotate_statement(stmt, env, memo=None):
+    if memo is None:
+        memo = type_checker.TypeMemo(annotate=True)
+    annotator = _STATEMENT_ANNOTATORS.get(type(stmt)) or _annotator_for(_STATEMENT_ANNOTATORS, stmt)
+    if annotator is not None:
+        annotator(stmt, env, memo)
+
+def _annotate_assignment(stmt, env, memo):
+    annotate_expression(stmt.lvalue, env, memo)
+    annotate_expression(stmt.rvalue, env, memo)
+
+def _annotate_while_loop(stmt, env, memo):
+    annotate_expression(stmt.condition, env, memo)
+    annotate_statement(stmt.body, env, memo)
+
+def _annotate_decl_stmt(stmt, env, memo):
+    annotate_declaration(stmt.declaration, env, memo)
+
+def _annotate_expr_stmt(stmt, env, memo):
+    annotate_expression(stmt.expression, env, memo)
+
+def _annotator_for(annotators, node):
+    # A subclass of a node class is annotated like that class. Anything else
+    # is not annotated at all.
+    for cls, annotator in annotators.items():
+        if isinstance(node, cls):
+            return annotator
+    return None
 
 """
-Recursively goes to lower levels of the AST. 
-Once Primitives are reached,  annotate with their types. 
-Return to parent level and annotate based on children types.
-Repeat process for entire AST.
+Annotates every node of the expression with its type, in the single walk of
+the tree that infers the expression's type: each node is typed once, from its
+children's types, and given that type as it goes.
 
 Args: 
     expr: The expression whose type is being checked.
     env: The environment where program variables are recorded.
+    memo: Types already inferred, shared with the rest of the program.
     
 Returns:
     expr: The expression, now typed.
 """
-def annotate_expression(expr, env):
-    match expr:
-        # Literal Cases
-        case ast_nodes.ArrayLiteral(value):
-            for v in value:
-                annotate_expression(v, env)
-        case ast_nodes.RecordLiteral(_, field_values):
-            for v in field_values.values():
-                annotate_expression(v, env)
-        case ast_nodes.LambdaLiteral(params, body):
-            local_env = env.copy()
-            for p in params:
-                local_env[p.name] = p.type
-            annotate_expression(body, local_env)
-        case ast_nodes.PrimitiveLiteral():
-            pass
-
-        # PlaceExpression Case
-        case ast_nodes.FieldRef(record, _):
-            annotate_expression(record, env)
-        case ast_nodes.VarRef():
-            pass
-
-        # Function & Operator Call
-        case ast_nodes.FunctionCall(function, arguments):
-            annotate_expression(function, env)
-            for a in arguments:
-                annotate_expression(a, env)
-        case ast_nodes.OperatorCall(_, operands):
-            for o in operands:
-                annotate_expression(o, env)
-
-        # Block, IfExpr Cases
-        case ast_nodes.IfExpr(condition, then_expr, else_expr):
-            annotate_expression(condition, env)
-            annotate_expression(then_expr, env)
-            annotate_expression(else_expr, env)
-        case ast_nodes.Block(statements):
-            local_env = env.copy()
-            for s in statements:
-                annotate_statement(s, local_env)
-        case _:
-            pass
-
-    t = type_checker.infer_expression_type(expr, env)
-    setattr(expr, "type", t)
-    return expr
\ No newline at end of file
+def annotate_expression(expr, env, memo=None):
+    if memo is None:
+        memo = type_checker.TypeMemo(annotate=True)
+    type_checker.infer_expression_type(expr, env, memo)
+    return expr
+
+_DECLARATION_ANNOTATORS = {
+    ast_nodes.VarDecl: _annotate_var_decl,
+    ast_nodes.FunctionDef: _annotate_function_def,
+    ast_nodes.RecordTypeDecl: _annotate_record_type_decl,
+}
+
+_STATEMENT_ANNOTATORS = {
+    ast_nodes.Assignment: _annotate_assignment,
+    ast_nodes.WhileLoop: _annotate_while_loop,
+    ast_nodes.DeclStmt: _annotate_decl_stmt,
+    ast_nodes.ExprStmt: _annotate_expr_stmt,
+}
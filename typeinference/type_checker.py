@@ -1,5 +1,56 @@
+from collections.abc import Callable, Generator, Mapping
+from itertools import islice
+from weakref import WeakValueDictionary
+
 import ast_nodes
 
+# One Type per distinct (base type, dimension) the checker infers. Types are
+# never mutated after construction, so every node can share them, and equal
+# inferred types are then the same object. Entries go away with their last user.
+_TYPE_INTERN: WeakValueDictionary[tuple[ast_nodes.BaseType, int], ast_nodes.Type] = WeakValueDictionary()
+
+"""
+Returns the shared Type for a base type and dimension, building it the first time.
+
+Args:
+    base_type: ast_nodes.BaseType - The base type.
+    dimension: int - The array dimension.
+
+Returns:
+    ast_nodes.Type: The one Type equal to Type(base_type, dimension).
+"""
+def mk_type(base_type: ast_nodes.BaseType, dimension: int) -> ast_nodes.Type:
+    # a record type carrying its declaration's fields is neither shared nor
+    # looked up: records compare by name, so a field-less type of the same
+    # name (or another declaration's) would be handed out in its place
+    if getattr(base_type, "fields", None) is not None:
+        return ast_nodes.Type(base_type, dimension)
+    key = (base_type, dimension)
+    t = _TYPE_INTERN.get(key)
+    if t is None:
+        t = _TYPE_INTERN[key] = ast_nodes.Type(base_type, dimension)
+    return t
+
+# Scalar primitive types, returned wherever one is inferred
+_T_BOOL = mk_type(ast_nodes.PrimitiveType("bool"), 0)
+_T_INT = mk_type(ast_nodes.PrimitiveType("int"), 0)
+_T_FLOAT = mk_type(ast_nodes.PrimitiveType("float"), 0)
+_T_UNIT = mk_type(ast_nodes.PrimitiveType("unit"), 0)
+
+# Field-less record type by record name, shared by record literals so
+# typing one allocates nothing
+_RECORD_TYPES: WeakValueDictionary[str, ast_nodes.Type] = WeakValueDictionary()
+
+def _record_type(name: str) -> ast_nodes.Type:
+    t = _RECORD_TYPES.get(name)
+    if t is None:
+        t = _RECORD_TYPES[name] = mk_type(ast_nodes.RecordType(name), 0)
+    return t
+
+# Type of a primitive literal by the exact python type of its value.
+# type(True) is bool, so bools never fall through to int.
+_LITERAL_TYPES: dict[type, ast_nodes.Type] = {bool: _T_BOOL, int: _T_INT, float: _T_FLOAT}
+
 """
 Implements array broadcasting rules similar to NumPy.
 Aligns dimensions from the right and checks compatibility.
@@ -27,244 +78,553 @@ def broadcast_dimensions(param_dims: list[int], arg_dims: list[int]) -> int:
             raise TypeError(f"Cannot broadcast dimensions {p} and {a}")
     return max_dim
 
+"""
+A scope nested in another environment. Names bound in it go to its own
+locals, so the enclosing environment is left as it was and nothing is
+copied. Lookups fall through to the parent, which is either another Env or
+the caller's plain dict at the root.
+
+Attributes:
+    parent: _Scope - The enclosing environment.
+    locals: dict[str, ast_nodes.Type] | None - Names bound in this scope;
+        not allocated until the first one is.
+"""
+class Env:
+    __slots__ = ("parent", "locals")
+
+    def __init__(self, parent: "Env | Mapping[str, ast_nodes.Type]") -> None:
+        self.parent = parent
+        self.locals: dict[str, ast_nodes.Type] | None = None
+
+    def __getitem__(self, name: str) -> ast_nodes.Type:
+        env = self
+        while env.__class__ is Env:
+            local = env.locals
+            if local is not None and name in local:
+                return local[name]
+            env = env.parent
+        return env[name]
+
+    def __contains__(self, name: str) -> bool:
+        env = self
+        while env.__class__ is Env:
+            local = env.locals
+            if local is not None and name in local:
+                return True
+            env = env.parent
+        return name in env
+
+    def __setitem__(self, name: str, t: ast_nodes.Type) -> None:
+        if self.locals is None:
+            self.locals = {name: t}
+        else:
+            self.locals[name] = t
+
+    def get(self, name: str, default: ast_nodes.Type | None = None) -> ast_nodes.Type | None:
+        # one walk up the scopes, not one for `in` and another for the lookup
+        try:
+            return self[name]
+        except KeyError:
+            return default
+
+# Any environment the checker reads: one of its own scopes or the caller's dict
+_Scope = Env | Mapping[str, ast_nodes.Type]
+
+"""
+Opens a scope nested in env.
+
+Args:
+    env: _Scope - The enclosing environment.
+
+Returns:
+    Env: The environment of the nested scope.
+"""
+def child_scope(env: _Scope) -> Env:
+    return Env(env)
+
+"""
+Types already inferred by infer_expression_type. A node reached more than once
+(a subtree shared by several parents, or a subtree typed again as part of its
+parent) is only typed once per state of the scope it is typed in.
+
+A caller that passes the same memo to several calls has to keep the typed
+trees alive while it does, and bump generation whenever it creates a scope
+or binds a name in one between calls.
+
+Attributes:
+    types: dict[tuple[int, int, int], ast_nodes.Type] - Type per (node id, scope id, generation).
+    generation: int - Bumped whenever a scope is opened or a name is bound in one,
+        so no entry outlives the scope state it was computed in.
+    annotate: bool - Whether every node typed is also given its type as its
+        `type` attribute, in the same walk (as type_annotator does).
+"""
+class TypeMemo:
+    __slots__ = ("types", "generation", "annotate")
+
+    def __init__(self, annotate: bool = False) -> None:
+        self.types: dict[tuple[int, int, int], ast_nodes.Type] = {}
+        self.generation: int = 0
+        self.annotate: bool = annotate
+
 """
 Takes an expression as input and returns its type as output.
 
 Args:
   expr: ast_nodes.Expression - The expression in question. 
-  env: dict[str, ast_nodes.Type] - The environment where program variables are recorded. 
+  env: _Scope - The environment where program variables are recorded. 
+  memo: TypeMemo | None - Types inferred by earlier calls, to reuse and extend.
 
 Returns:
   ast_nodes.Type: The type of the expression.
 """
-def infer_expression_type(expr: ast_nodes.Expression, env: dict[str, ast_nodes.Type]) -> ast_nodes.Type:
-    # Check which expression type we are dealing with
-    match expr:
-        # Primitive types are just returned
-        case ast_nodes.PrimitiveLiteral(value):
-            if isinstance(value, bool):
-                return ast_nodes.Type(ast_nodes.PrimitiveType("bool"), 0)
-            elif isinstance(value, int):
-                return ast_nodes.Type(ast_nodes.PrimitiveType("int"), 0)
-            elif isinstance(value, float):
-                return ast_nodes.Type(ast_nodes.PrimitiveType("float"), 0)
+def infer_expression_type(expr: ast_nodes.Expression, env: _Scope, memo: TypeMemo | None = None) -> ast_nodes.Type:
+    return _infer(expr, env, memo if memo is not None else TypeMemo())
+
+# What the handler of an inner node (or of a statement) is: a generator that
+# yields (child, env) for every child it needs typed, is sent back that
+# child's type, and returns the type of its own node.
+_Inference = Generator[tuple[ast_nodes.Expression, _Scope], ast_nodes.Type, ast_nodes.Type]
+
+def _infer(expr: ast_nodes.Expression, env: _Scope, memo: TypeMemo) -> ast_nodes.Type:
+    # Walks the tree without recursing: handlers of inner nodes are generators
+    # that yield (child, env) for each child they need typed and are sent its
+    # type back, so however deep the tree, this is the only python frame deep.
+    types = memo.types
+    annotate = memo.annotate
+    # handlers waiting for a child's type, innermost last, with their node and its memo key
+    stack: list[tuple[_Inference, ast_nodes.Expression, tuple[int, int, int]]] = []
+    node, node_env = expr, env
+    while True:
+        t = exc = None
+        try:
+            handler = _EXPRESSION_HANDLERS.get(type(node)) or _handler_for(node)
+            if handler in _LEAF_HANDLERS:
+                # a single lookup: cheaper to redo than to memoize
+                t = handler(node, node_env, memo)
             else:
-                raise TypeError(f"Unexpected expression type: {type(expr)}")
-
-        # Check if all array elements are the same type, then return that type
-        # and dimension_size + 1 (since an array of scalars is a vector, array
-        # of vectors is a matrix, etc.
-        case ast_nodes.ArrayLiteral(value):
-            first_elem_type = infer_expression_type(value[0], env)
-
-            for element in value[1:]:
-                elem_type = infer_expression_type(element, env)
-                if elem_type != first_elem_type:
-                    raise TypeError(f"Array types are not homogeneous: {first_elem_type}")
-                if elem_type.dimension != first_elem_type.dimension:
-                    raise TypeError(f"Array elements must have the same dimension: {first_elem_type}")
-
-            return ast_nodes.Type(first_elem_type.base_type, first_elem_type.dimension + 1)
-
-        case ast_nodes.LambdaLiteral(params, body):
-            # Assume parameters already have typed due to the partially typed AST
-            for p in params:
-                if p.type is None:
-                    raise TypeError(f"Lambda parameter '{p.name}' must have an explicit type")
-
-            # Local environment for the lambda function
-            lambda_env = env.copy()
-            for p in params:
-                lambda_env[p.name] = p.type
-
-            # Infer the return type from the body expression
-            body_type = infer_expression_type(body, lambda_env)
-
-            # Build the return type from parameter and return types
-            fn_base = ast_nodes.FunctionType(
-                param_types=[p.type for p in params],
-                return_type=body_type
-            )
-
-            return ast_nodes.Type(fn_base, 0)
-
-        case ast_nodes.RecordLiteral(record_name, field_values):
-            # Check that each record field type is valid
-            for field_name, field_value in field_values.items():
-                try:
-                    infer_expression_type(field_value, env)
-                except TypeError:
-                    raise TypeError(f"Error inferring type of {field_name}: {field_value}")
-
-            return ast_nodes.Type(ast_nodes.RecordType(record_name), 0)
-
-        case ast_nodes.VarRef(name):
-            if name not in env:
-                raise TypeError(f"Variable name '{name}' is not in the environment.")
-            return env[name]
-
-        case ast_nodes.FieldRef(record, field_name):
-            record_type = infer_expression_type(record, env)
-            if not isinstance(record_type.base_type, ast_nodes.RecordType):
-                raise TypeError(f"Cannot access field '{field_name}' on non-record type {record_type}")
-
-            record_name = record_type.base_type.name
-            if record_name not in env or not isinstance(env[record_name].base_type, ast_nodes.RecordType):
-                raise TypeError(f"Unknown record type: {record_name}")
-
-            # The record declaration must be in the environment
-            record_decl = env[record_name]
-            fields = record_decl.base_type.fields if hasattr(record_decl.base_type, "fields") else {}
+                # the tree stays alive as long as the memo is used, so node ids can't be reused
+                key = (id(node), id(node_env), memo.generation)
+                t = types.get(key)
+                if t is None:
+                    # started below by sending it None
+                    stack.append((handler(node, node_env, memo), node, key))
+            if annotate and t is not None:
+                node.type = t
+        except Exception as e:
+            exc = e
+
+        # hand the type (or the error) to the innermost waiting handler
+        while True:
+            if not stack:
+                if exc is not None:
+                    raise exc
+                return t
+            gen, gen_node, gen_key = stack[-1]
+            try:
+                node, node_env = gen.throw(exc) if exc is not None else gen.send(t)
+                break
+            except StopIteration as stop:
+                stack.pop()
+                t = types[gen_key] = stop.value
+                if annotate:
+                    gen_node.type = t
+                exc = None
+            except Exception as e:
+                stack.pop()
+                exc = e
+
+def _handler_for(expr: ast_nodes.Expression) -> Callable:
+    # One dict lookup on the exact node class picks the handler
+    handler = _EXPRESSION_HANDLERS.get(type(expr))
+    if handler is None:
+        handler = _handler_for_subclass(_EXPRESSION_HANDLERS, type(expr))
+        if handler is None:
+            raise TypeError(f"Unexpected expression type: {type(expr)}")
+    return handler
+
+"""
+Types a node without children (a PrimitiveLiteral or a VarRef) directly,
+without setting up a walk of the tree.
+
+Args:
+    expr: ast_nodes.Expression - The expression in question.
+    env: _Scope - The environment where program variables are recorded.
+
+Returns:
+    ast_nodes.Type | None: The type of the expression, or None if it is not a leaf.
+"""
+def infer_leaf_type(expr: ast_nodes.Expression, env: _Scope) -> ast_nodes.Type | None:
+    handler = _EXPRESSION_HANDLERS.get(type(expr))
+    if handler in _LEAF_HANDLERS:
+        return handler(expr, env, None)
+    return None
+
+_ARITHMETIC_OPERATORS = frozenset(("+", "-", "*", "/", "%"))
+_COMPARISON_OPERATORS = frozenset(("<", "<=", ">", ">=", "==", "!="))
 
-            if field_name not in fields:
-                raise TypeError(f"Field '{field_name}' not found in record '{record_name}'")
+"""
+The type an operator gives when applied to operands of the given types.
+Operands must share a base type; the result takes the largest dimension.
 
-            field_type = fields[field_name]
-            return ast_nodes.Type(field_type.base_type, field_type.dimension + record_type.dimension)
+Args:
+    operator: str - The operator in question.
+    operand_types: list[ast_nodes.Type] - The types of its operands.
 
-        case ast_nodes.FunctionCall(function, arguments):
-            function_type = infer_expression_type(function, env)
+Returns:
+    ast_nodes.Type: The type of the operator call.
+"""
+def operator_type(operator: str, operand_types: list[ast_nodes.Type]) -> ast_nodes.Type:
+    first_type = operand_types[0]
 
-            if not isinstance(function_type.base_type, ast_nodes.FunctionType):
-                raise TypeError(f"Trying to call non-function value of type {function_type}")
+    for t in operand_types[1:]:
+        if t.base_type != first_type.base_type:
+            raise TypeError(f"Operand types do not match: {operand_types}")
 
-            # Assume that our arguments are typed already
-            arg_types = [infer_expression_type(arg, env) for arg in arguments]
-            param_types = function_type.base_type.param_types
+    result_dim = max(t.dimension for t in operand_types)
 
-            # If the number of expected parameters differs from the actually typed out ones
-            if len(arg_types) != len(param_types):
-                raise TypeError(f"Argument count mismatch: expected {len(param_types)}, got {len(arg_types)}")
+    if operator in _ARITHMETIC_OPERATORS:
+        return mk_type(first_type.base_type, result_dim)
+    elif operator in _COMPARISON_OPERATORS:
+        return mk_type(_T_BOOL.base_type, result_dim)
+    else:
+        raise TypeError(f"Unknown operator: {operator}")
 
-            # Check base-type compatibility and collect dimensions
-            for a_t, p_t in zip(arg_types, param_types):
-                if a_t.base_type != p_t.base_type:
-                    raise TypeError(f"Argument type mismatch: expected {p_t.base_type}, got {a_t.base_type}")
+"""
+Finds the handler of a node class that has none of its own in a handler
+table, by walking its base classes the way singledispatch would, and records
+it for that class so the next lookup is a plain dict hit again.
 
-            # Compute broadcasted dimension for all parameters and arguments
-            param_dims = [p.dimension for p in param_types]
-            arg_dims = [a.dimension for a in arg_types]
+Args:
+    handlers: dict[type, Callable] - _EXPRESSION_HANDLERS or _STATEMENT_HANDLERS.
+    cls: type - The node class that missed.
 
-            try:
-                # if any two argument dimensions are incompatible, fail
-                for i in range(len(arg_dims)):
-                    for j in range(i + 1, len(arg_dims)):
-                        _ = broadcast_dimensions([arg_dims[i]], [arg_dims[j]])
-                broadcasted_dim = max(arg_dims)
-            except TypeError as e:
-                raise TypeError(f"Cannot broadcast in call to function '{getattr(function, 'name', '<lambda>')}': {e}")
-
-            ret_type = function_type.base_type.return_type
-            return ast_nodes.Type(ret_type.base_type, ret_type.dimension + broadcasted_dim)
-
-        case ast_nodes.OperatorCall(operator, operands):
-            # Get the types of all operands
-            operand_types = [infer_expression_type(op, env) for op in operands]
-            first_type = operand_types[0]
-
-            for t in operand_types[1:]:
-                if t.base_type != first_type.base_type:
-                    raise TypeError(f"Operand types do not match: {operand_types}")
-
-            result_dim = max(t.dimension for t in operand_types)
-
-            if operator in ("+", "-", "*", "/", "%"):
-                return ast_nodes.Type(first_type.base_type, result_dim)
-            elif operator in ("<", "<=", ">", ">=", "==", "!="):
-                return ast_nodes.Type(ast_nodes.PrimitiveType("bool"), result_dim)
-            else:
-                raise TypeError(f"Unknown operator: {operator}")
-
-        case ast_nodes.Block(statements):
-            # To deal with a block, we need a copy environment
-            block_env = env.copy()
-
-            # Assume there will be no final statement that returns anything,
-            # therefore make the type of the last statement "unit".
-            last_type = ast_nodes.Type(ast_nodes.PrimitiveType("unit"), 0)
-
-            for stmt in statements:
-                match stmt:
-                    case ast_nodes.ExprStmt(expression):
-                        last_type = infer_expression_type(expression, block_env)
-
-                    case ast_nodes.Assignment(lvalue, rvalue):
-                        match lvalue:
-                            case ast_nodes.VarRef(name):
-                                if name not in block_env:
-                                    raise TypeError(f"Variable '{name}' not declared before assignment")
-                                ltype = block_env[name]
-                            case ast_nodes.FieldRef():
-                                ltype = infer_expression_type(lvalue, block_env)
-                            case _:
-                                raise TypeError("Invalid assignment target")
-
-                        rtype = infer_expression_type(rvalue, block_env)
-                        if (ltype.base_type != rtype.base_type) or (ltype.dimension != rtype.dimension):
-                            raise TypeError(f"Assignment mismatch: {ltype} vs {rtype}")
-
-                        last_type = ast_nodes.Type(ast_nodes.PrimitiveType("unit"), 0)
-
-                    case ast_nodes.DeclStmt(declaration):
-                        match declaration:
-                            case ast_nodes.VarDecl(name, type_, mutable, initializer):
-                                init_type = infer_expression_type(initializer, block_env) if initializer else None
-                                if type_ and init_type and (
-                                        init_type.base_type != type_.base_type or init_type.dimension != type_.dimension
-                                ):
-                                    raise TypeError(f"Initializer type mismatch for '{name}': {init_type} vs {type_}")
-                                var_type = type_ or init_type
-                                if var_type is None:
-                                    raise TypeError(f"Cannot determine type of variable '{name}'")
-                                block_env[name] = var_type
-
-                            case ast_nodes.RecordTypeDecl(name, fields):
-                                for field in fields:
-                                    if field.type is None:
-                                        raise TypeError(f"Field '{field.name}' in record '{name}' has no type")
-                                    if field.initializer:
-                                        infer_expression_type(field.initializer, block_env)
-                                block_env[name] = ast_nodes.Type(ast_nodes.RecordType(name), 0)
-
-                            case ast_nodes.FunctionDef():
-                                # Globally handled in typeinference/type_annotator.py
-                                # Are nested functions like this required?
-                                pass
-
-                    case ast_nodes.WhileLoop(condition, body):
-                        cond_type = infer_expression_type(condition, block_env)
-                        if not (isinstance(cond_type.base_type, ast_nodes.PrimitiveType)
-                                and cond_type.base_type.name == "bool"
-                                and cond_type.dimension == 0):
-                            raise TypeError(f"While condition must be bool, got {cond_type}")
-
-                        # assume body is a Block expression node
-                        infer_expression_type(body, block_env)
-
-                        last_type = ast_nodes.Type(ast_nodes.PrimitiveType("unit"), 0)
-
-                    case _:
-                        raise TypeError(f"Unsupported statement in block: {stmt}")
-
-            return last_type
-
-        case ast_nodes.IfExpr(condition, then_expr, else_expr):
-            condition_type = infer_expression_type(condition, env)
-
-            if not (isinstance(condition_type.base_type, ast_nodes.PrimitiveType)
-                    and condition_type.base_type.name == "bool"
-                    and condition_type.dimension == 0):
-                raise TypeError(f"The condition of the if-expression must be of type bool, but it is {condition_type} instead.")
-
-            then_expr_type = infer_expression_type(then_expr, env)
-            else_expr_type = infer_expression_type(else_expr, env)
-
-            if then_expr_type.base_type != else_expr_type.base_type:
-                raise TypeError(f"Branches must match types: {then_expr_type.base_type} | {else_expr_type.base_type}")
-            elif else_expr_type.dimension != then_expr_type.dimension:
-                raise TypeError(f"Branches must match dimensions: {then_expr_type.dimension} | {else_expr_type.dimension}")
-
-            return ast_nodes.Type(then_expr_type.base_type, then_expr_type.dimension)
-
-        case _:
-            raise TypeError(f"Unexpected expression type: {type(expr)}")
\ No newline at end of file
+Returns:
+    Callable | None: The handler of the nearest base class, or None.
+"""
+def _handler_for_subclass(handlers: dict[type, Callable], cls: type) -> Callable | None:
+    for base in cls.__mro__[1:]:
+        handler = handlers.get(base)
+        if handler is not None:
+            handlers[cls] = handler
+            return handler
+    return None
+
+# Conditions must be scalar bools. Inferred conditions are the interned _T_BOOL,
+# so the identity test settles them; a bool from the caller's env compares by value.
+def _require_bool(t: ast_nodes.Type, where: str) -> None:
+    if t is not _T_BOOL and t != _T_BOOL:
+        raise TypeError(f"{where} must be bool, got {t}")
+
+# Primitive types are just returned
+def _infer_primitive_literal(expr: ast_nodes.PrimitiveLiteral, env: _Scope, memo: TypeMemo | None) -> ast_nodes.Type:
+    t = _LITERAL_TYPES.get(type(expr.value))
+    if t is None:
+        raise TypeError(f"Unexpected expression type: {type(expr)}")
+    return t
+
+# Check if all array elements are the same type, then return that type
+# and dimension_size + 1 (since an array of scalars is a vector, array
+# of vectors is a matrix, etc.
+def _infer_array_literal(expr: ast_nodes.ArrayLiteral, env: _Scope, memo: TypeMemo) -> _Inference:
+    value = expr.value
+    first_elem_type = (yield value[0], env)
+
+    # Interned element types compare by identity; one == covers the rest.
+    # Type equality includes the dimension, so a dimension mismatch is
+    # reported as non-homogeneous too
+    for element in islice(value, 1, None):
+        elem_type = (yield element, env)
+        if elem_type is not first_elem_type and elem_type != first_elem_type:
+            raise TypeError(f"Array types are not homogeneous: {first_elem_type}")
+
+    return mk_type(first_elem_type.base_type, first_elem_type.dimension + 1)
+
+def _infer_lambda_literal(expr: ast_nodes.LambdaLiteral, env: _Scope, memo: TypeMemo) -> _Inference:
+    params = expr.params
+    # Assume parameters already have typed due to the partially typed AST
+    for p in params:
+        if p.type is None:
+            raise TypeError(f"Lambda parameter '{p.name}' must have an explicit type")
+
+    # Local environment for the lambda function
+    lambda_env = child_scope(env)
+    for p in params:
+        lambda_env[p.name] = p.type
+    memo.generation += 1
+
+    # Infer the return type from the body expression
+    body_type = (yield expr.body, lambda_env)
+
+    # Build the return type from parameter and return types
+    fn_base = ast_nodes.FunctionType(
+        param_types=[p.type for p in params],
+        return_type=body_type
+    )
+
+    return mk_type(fn_base, 0)
+
+def _infer_record_literal(expr: ast_nodes.RecordLiteral, env: _Scope, memo: TypeMemo) -> _Inference:
+    # Check that each record field type is valid; a field's own error propagates as is
+    for _, field_value in expr.field_items:
+        yield field_value, env
+
+    return _record_type(expr.type)
+
+def _infer_var_ref(expr: ast_nodes.VarRef, env: _Scope, memo: TypeMemo | None) -> ast_nodes.Type:
+    # One lookup walks the scopes; a missing name is the rare case
+    try:
+        return env[expr.name]
+    except KeyError:
+        raise TypeError(f"Variable name '{expr.name}' is not in the environment.") from None
+
+def _infer_field_ref(expr: ast_nodes.FieldRef, env: _Scope, memo: TypeMemo) -> _Inference:
+    field_name = expr.field_name
+    record_type = (yield expr.record, env)
+    if not isinstance(record_type.base_type, ast_nodes.RecordType):
+        raise TypeError(f"Cannot access field '{field_name}' on non-record type {record_type}")
+
+    # A record type the annotator built from its declaration carries the
+    # fields itself; any other copy of it has to find the declaration in env
+    record_name = record_type.base_type.name
+    fields = getattr(record_type.base_type, "fields", None)
+    if fields is None:
+        try:
+            record_decl = env[record_name]
+        except KeyError:
+            raise TypeError(f"Unknown record type: {record_name}") from None
+        if not isinstance(record_decl.base_type, ast_nodes.RecordType):
+            raise TypeError(f"Unknown record type: {record_name}")
+        fields = getattr(record_decl.base_type, "fields", None) or {}
+
+    field_type = fields.get(field_name)
+    if field_type is None:
+        raise TypeError(f"Field '{field_name}' not found in record '{record_name}'")
+
+    return mk_type(field_type.base_type, field_type.dimension + record_type.dimension)
+
+def _infer_function_call(expr: ast_nodes.FunctionCall, env: _Scope, memo: TypeMemo) -> _Inference:
+    function = expr.function
+    function_type = (yield function, env)
+
+    if not isinstance(function_type.base_type, ast_nodes.FunctionType):
+        raise TypeError(f"Trying to call non-function value of type {function_type}")
+
+    # Assume that our arguments are typed already
+    arg_types = []
+    for arg in expr.arguments:
+        arg_types.append((yield arg, env))
+    param_base_types = function_type.base_type.param_base_types
+
+    # If the number of expected parameters differs from the actually typed out ones
+    if len(arg_types) != len(param_base_types):
+        raise TypeError(f"Argument count mismatch: expected {len(param_base_types)}, got {len(arg_types)}")
+
+    # One pass checks base-type compatibility (shared base types compare by
+    # identity) and computes the broadcasted dimension. Two dimensions are
+    # compatible if they're equal or one is a scalar, so all of them are
+    # exactly when at most one distinct non-scalar dimension occurs. A clash
+    # is reported after the loop, so a base-type mismatch still wins.
+    broadcasted_dim = 0
+    clash = None
+    for a_t, p_base in zip(arg_types, param_base_types):
+        a_base = a_t.base_type
+        if a_base is not p_base and a_base != p_base:
+            raise TypeError(f"Argument type mismatch: expected {p_base}, got {a_base}")
+        d = a_t.dimension
+        if d and d != broadcasted_dim:
+            if not broadcasted_dim:
+                broadcasted_dim = d
+            elif clash is None:
+                clash = d
+    if clash is not None:
+        raise TypeError(f"Cannot broadcast in call to function '{getattr(function, 'name', '<lambda>')}': "
+                        f"Cannot broadcast dimensions {broadcasted_dim} and {clash}")
+
+    ret_type = function_type.base_type.return_type
+    return mk_type(ret_type.base_type, ret_type.dimension + broadcasted_dim)
+
+def _infer_operator_call(expr: ast_nodes.OperatorCall, env: _Scope, memo: TypeMemo) -> _Inference:
+    operands = expr.operands
+    if len(operands) == 2:
+        # Nearly every operator is binary: type both sides without building
+        # a list, same checks and errors as operator_type
+        left = (yield operands[0], env)
+        right = (yield operands[1], env)
+        if left is not right and left.base_type != right.base_type:
+            raise TypeError(f"Operand types do not match: {[left, right]}")
+        operator = expr.operator
+        dim = left.dimension if left.dimension >= right.dimension else right.dimension
+        if operator in _ARITHMETIC_OPERATORS:
+            return mk_type(left.base_type, dim)
+        if operator in _COMPARISON_OPERATORS:
+            return _T_BOOL if dim == 0 else mk_type(_T_BOOL.base_type, dim)
+        raise TypeError(f"Unknown operator: {operator}")
+
+    # Get the types of all operands
+    operand_types = []
+    for op in operands:
+        operand_types.append((yield op, env))
+    return operator_type(expr.operator, operand_types)
+
+def _infer_block(expr: ast_nodes.Block, env: _Scope, memo: TypeMemo) -> _Inference:
+    # To deal with a block that declares names, we need a scope of its own on
+    # top of env. Other statements never bind a name, so a block without
+    # declarations shares env with its siblings and opens no scope at all.
+    if any(isinstance(stmt, ast_nodes.DeclStmt) for stmt in expr.statements):
+        block_env = child_scope(env)
+        memo.generation += 1
+    else:
+        block_env = env
+
+    # Assume there will be no final statement that returns anything,
+    # therefore make the type of the last statement "unit".
+    last_type = _T_UNIT
+
+    for stmt in expr.statements:
+        handler = _STATEMENT_HANDLERS.get(type(stmt))
+        if handler is None:
+            handler = _handler_for_subclass(_STATEMENT_HANDLERS, type(stmt))
+            if handler is None:
+                raise TypeError(f"Unsupported statement in block: {stmt}")
+        # declarations give None and leave the block's type as it was
+        stmt_type = yield from handler(stmt, block_env, memo)
+        if stmt_type is not None:
+            last_type = stmt_type
+
+    return last_type
+
+def _infer_if_expr(expr: ast_nodes.IfExpr, env: _Scope, memo: TypeMemo) -> _Inference:
+    condition_type = (yield expr.condition, env)
+
+    _require_bool(condition_type, "The condition of the if-expression")
+
+    then_expr_type = (yield expr.then_expr, env)
+    else_expr_type = (yield expr.else_expr, env)
+
+    # Interned branch types settle it by identity; types from the caller's env may need the structural compare
+    if then_expr_type is not else_expr_type and then_expr_type != else_expr_type:
+        raise TypeError(f"Branches must match types: {then_expr_type} | {else_expr_type}")
+
+    return mk_type(then_expr_type.base_type, then_expr_type.dimension)
+
+# Statements of a block. Each gets the block's own scope and returns the
+# statement's type, or None if it does not change the type of the block.
+# The block runs them with `yield from`, so their children go through _infer too.
+def _check_expr_stmt(stmt: ast_nodes.ExprStmt, block_env: Env, memo: TypeMemo) -> _Inference:
+    return (yield stmt.expression, block_env)
+
+def _check_assignment(stmt: ast_nodes.Assignment, block_env: Env, memo: TypeMemo) -> _Inference:
+    lvalue = stmt.lvalue
+    if not isinstance(lvalue, (ast_nodes.VarRef, ast_nodes.FieldRef)):
+        raise TypeError("Invalid assignment target")
+
+    # The right-hand side first: the target is only worth typing once it is known to be valid
+    rtype = (yield stmt.rvalue, block_env)
+    if isinstance(lvalue, ast_nodes.VarRef):
+        try:
+            ltype = block_env[lvalue.name]
+        except KeyError:
+            raise TypeError(f"Variable '{lvalue.name}' not declared before assignment") from None
+        if memo.annotate:
+            lvalue.type = ltype
+    else:
+        ltype = (yield lvalue, block_env)
+
+    if ltype is not rtype and ltype != rtype:
+        raise TypeError(f"Assignment mismatch: {ltype} vs {rtype}")
+
+    return _T_UNIT
+
+def _check_decl_stmt(stmt: ast_nodes.DeclStmt, block_env: Env, memo: TypeMemo) -> Generator[tuple[ast_nodes.Expression, _Scope], ast_nodes.Type, None]:
+    declaration = stmt.declaration
+    checker = _DECLARATION_HANDLERS.get(type(declaration))
+    if checker is None:
+        checker = _handler_for_subclass(_DECLARATION_HANDLERS, type(declaration))
+    if checker is not None:
+        yield from checker(declaration, block_env, memo)
+    return None
+
+def _check_var_decl(declaration: ast_nodes.VarDecl, block_env: Env, memo: TypeMemo) -> Generator[tuple[ast_nodes.Expression, _Scope], ast_nodes.Type, None]:
+    name, type_, initializer = declaration.name, declaration.type, declaration.initializer
+    init_type = (yield initializer, block_env) if initializer else None
+    if type_ and init_type and (
+            init_type.base_type != type_.base_type or init_type.dimension != type_.dimension
+    ):
+        raise TypeError(f"Initializer type mismatch for '{name}': {init_type} vs {type_}")
+    var_type = type_ or init_type
+    if var_type is None:
+        raise TypeError(f"Cannot determine type of variable '{name}'")
+    block_env[name] = var_type
+    memo.generation += 1
+    if memo.annotate:
+        declaration.type = var_type
+
+def _check_record_type_decl(declaration: ast_nodes.RecordTypeDecl, block_env: Env, memo: TypeMemo) -> Generator[tuple[ast_nodes.Expression, _Scope], ast_nodes.Type, None]:
+    name = declaration.name
+    for field in declaration.fields:
+        if field.type is None:
+            raise TypeError(f"Field '{field.name}' in record '{name}' has no type")
+        if field.initializer:
+            yield field.initializer, block_env
+    # The fields ride on the type, so a FieldRef on this record reads them
+    # without going back to the declaration; not interned, like the
+    # annotator's top-level record types
+    base_type = ast_nodes.RecordType(name)
+    base_type.fields = {f.name: f.type for f in declaration.fields}
+    record_type = block_env[name] = ast_nodes.Type(base_type, 0)
+    memo.generation += 1
+    if memo.annotate:
+        declaration.type = record_type
+
+def _check_function_def(declaration: ast_nodes.FunctionDef, block_env: Env, memo: TypeMemo) -> Generator[tuple[ast_nodes.Expression, _Scope], ast_nodes.Type, None]:
+    # Globally handled in typeinference/type_annotator.py
+    # Are nested functions like this required?
+    if memo.annotate:
+        # not bound in the block, but its body is annotated all the same
+        params = declaration.params
+        fn_type = mk_type(ast_nodes.FunctionType(param_types=[p.type for p in params], return_type=declaration.return_type), 0)
+        fn_env = child_scope(block_env)
+        fn_env[declaration.name] = fn_type
+        for p in params:
+            fn_env[p.name] = p.type
+        memo.generation += 1
+        yield declaration.body, fn_env
+        declaration.type = fn_type
+
+def _check_while_loop(stmt: ast_nodes.WhileLoop, block_env: Env, memo: TypeMemo) -> _Inference:
+    cond_type = (yield stmt.condition, block_env)
+    _require_bool(cond_type, "While condition")
+
+    # assume body is a Block expression node
+    yield stmt.body, block_env
+
+    return _T_UNIT
+
+_EXPRESSION_HANDLERS: dict[type, Callable] = {
+    ast_nodes.PrimitiveLiteral: _infer_primitive_literal,
+    ast_nodes.ArrayLiteral: _infer_array_literal,
+    ast_nodes.LambdaLiteral: _infer_lambda_literal,
+    ast_nodes.RecordLiteral: _infer_record_literal,
+    ast_nodes.VarRef: _infer_var_ref,
+    ast_nodes.FieldRef: _infer_field_ref,
+    ast_nodes.FunctionCall: _infer_function_call,
+    ast_nodes.OperatorCall: _infer_operator_call,
+    ast_nodes.Block: _infer_block,
+    ast_nodes.IfExpr: _infer_if_expr,
+}
+
+# handlers that need no child typed: plain functions returning the type
+_LEAF_HANDLERS = frozenset({_infer_primitive_literal, _infer_var_ref})
+
+_STATEMENT_HANDLERS: dict[type, Callable] = {
+    ast_nodes.ExprStmt: _check_expr_stmt,
+    ast_nodes.Assignment: _check_assignment,
+    ast_nodes.DeclStmt: _check_decl_stmt,
+    ast_nodes.WhileLoop: _check_while_loop,
+}
+
+_DECLARATION_HANDLERS: dict[type, Callable] = {
+    ast_nodes.VarDecl: _check_var_decl,
+    ast_nodes.RecordTypeDecl: _check_record_type_decl,
+    ast_nodes.FunctionDef: _check_function_def,
+}